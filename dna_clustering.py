@@ -6,9 +6,46 @@ Uses the new ancestry_person/ancestry_match graph schema.
 """
 
 import argparse
+import heapq
+import io
+import os
+import sys
+import weakref
 import psycopg2
 import networkx as nx
-from collections import defaultdict
+import numpy as np
+from functools import partial
+from operator import itemgetter
+from itertools import islice
+from multiprocessing import get_context
+
+try:
+    # Registers the GPU 'cugraph' backend for networkx dispatch (networkx >= 3.2)
+    import nx_cugraph  # noqa: F401
+    NX_BACKEND = 'cugraph'
+except ImportError:
+    NX_BACKEND = None
+
+try:
+    import igraph
+except ImportError:
+    igraph = None
+
+try:
+    import leidenalg
+except ImportError:
+    leidenalg = None
+
+try:
+    import networkit as nk
+except ImportError:
+    nk = None
+
+try:
+    import scipy.sparse
+    from numba import njit
+except ImportError:
+    njit = None
 
 # Database connection
 DB_CONFIG = {
@@ -23,171 +60,488 @@ DB_CONFIG = {
 CHRIS_ID = 'E756DE6C-0C8D-443B-8793-ADDB6F35FD6A'
 
 
-def build_graph(cursor, min_cm=0):
+# People with at least min_degree qualifying matches. Anyone below that
+# (isolated people, or with a single match) can't be part of a clique of 3+.
+KEPT_PEOPLE_CTE = """
+    WITH edge AS (
+        SELECT person1_id, person2_id, shared_cm
+        FROM ancestry_match
+        WHERE shared_cm >= %(min_cm)s OR shared_cm IS NULL
+    ), degree AS (
+        SELECT person1_id AS id FROM edge
+        UNION ALL
+        SELECT person2_id FROM edge
+    ), kept AS (
+        SELECT id FROM degree GROUP BY id HAVING count(*) >= %(min_degree)s
+    )
+"""
+
+# Columns of the edge CSV copied out of ancestry_match
+EDGE_DTYPE = [('p1', 'U36'), ('p2', 'U36'), ('cm', 'f8')]
+
+
+def stream_rows(cursor, name, query, params, itersize=10000):
+    """Run query on a server-side cursor, yielding rows in batches of itersize."""
+    stream = cursor.connection.cursor(name=name)
+    stream.itersize = itersize
+    try:
+        stream.execute(query, params)
+        yield from stream
+    finally:
+        stream.close()
+
+
+def build_graph(cursor, min_cm=0, min_degree=2):
     """
     Build a graph from ancestry_person (nodes) and ancestry_match (edges).
+    Edges below min_cm and people with fewer than min_degree such edges
+    are filtered out in SQL before anything is loaded.
+
+    Nodes are interned to ints and carry no attributes; returns the graph
+    and a numpy object array of names indexed by node, which is the only
+    copy of the names. G.graph['ancestry_ids'] maps nodes back to
+    ancestry ids and G.graph['chris'] is Chris's node (if kept).
     """
-    # Get all people (nodes)
-    cursor.execute("""
-        SELECT ancestry_id, name, person_id
-        FROM ancestry_person
-    """)
-    people = {row[0]: {'name': row[1], 'person_id': row[2]} for row in cursor.fetchall()}
+    params = {'min_cm': min_cm, 'min_degree': min_degree}
+    index = {}    # ancestry_id -> node
+    ids = []      # node -> ancestry_id
+    names = []    # node -> name
+
+    def add_person(ancestry_id, name=None):
+        node = index[ancestry_id] = len(ids)
+        ids.append(ancestry_id)
+        names.append(name or ancestry_id[:8] + "...")
+        return node
+
+    # Collect kept people (nodes)
+    for ancestry_id, name in stream_rows(cursor, 'dna_nodes', KEPT_PEOPLE_CTE + """
+        SELECT p.ancestry_id, p.name
+        FROM ancestry_person p
+        JOIN kept k ON k.id = p.ancestry_id
+    """, params):
+        add_person(ancestry_id, name)
+
+    # Copy edges between kept people as CSV straight into numpy arrays.
+    # COPY can't take bind parameters, so the query is mogrified first.
+    query = cursor.mogrify(KEPT_PEOPLE_CTE + """
+        SELECT e.person1_id, e.person2_id, e.shared_cm
+        FROM edge e
+        JOIN kept k1 ON k1.id = e.person1_id
+        JOIN kept k2 ON k2.id = e.person2_id
+    """, params).decode()
+    buf = io.BytesIO()
+    cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH CSV", buf)
+    buf.seek(0)
+    if buf.getbuffer().nbytes:
+        edges = np.genfromtxt(buf, delimiter=',', encoding='utf-8', ndmin=1, dtype=EDGE_DTYPE)
+    else:
+        edges = np.empty(0, dtype=EDGE_DTYPE)
+
+    def node_for(ancestry_id):
+        return index[ancestry_id] if ancestry_id in index else add_person(ancestry_id)
+
+    u = [node_for(a) for a in edges['p1'].tolist()]
+    v = [node_for(a) for a in edges['p2'].tolist()]
+    # NULL shared_cm comes through as nan
+    cm = np.nan_to_num(edges['cm']).tolist()
+
+    # Build networkx graph in bulk
+    G = nx.Graph(ancestry_ids=ids, chris=index.get(CHRIS_ID))
+    G.add_nodes_from(range(len(ids)))
+    G.add_weighted_edges_from(zip(u, v, cm), weight='shared_cm')
+
+    return G, np.array(names, dtype=object)
+
+
+def to_igraph(G):
+    """
+    Convert the networkx graph to an igraph graph with contiguous vertex ids.
+    Returns the igraph graph and a list mapping vertex index -> node.
+    """
+    ids = list(G.nodes())
+    idx = {node: i for i, node in enumerate(ids)}
+    edges = []
+    weights = []
+    for u, v, cm in G.edges(data='shared_cm', default=0.0):
+        edges.append((idx[u], idx[v]))
+        weights.append(cm)
+    ig = igraph.Graph(n=len(ids), edges=edges, edge_attrs={'weight': weights})
+    return ig, ids
 
-    # Get all edges above threshold
-    cursor.execute("""
-        SELECT person1_id, person2_id, shared_cm
-        FROM ancestry_match
-        WHERE shared_cm >= %s OR shared_cm IS NULL
-    """, (min_cm,))
-    edges = cursor.fetchall()
 
-    # Build networkx graph
-    G = nx.Graph()
+# Components per graph object. Keyed on the graph itself rather than stored in
+# G.graph, because subgraph views and copies share or copy that dict.
+_components_cache = weakref.WeakKeyDictionary()
+
 
-    # Add nodes
-    for ancestry_id, data in people.items():
-        G.add_node(ancestry_id, **data)
+def connected_components(G):
+    """
+    Connected components as a list of node sets (cuGraph or igraph when
+    available). Computed once per graph; graphs aren't modified after build.
+    """
+    if G in _components_cache:
+        return _components_cache[G]
 
-    # Add edges
-    for p1, p2, cm in edges:
-        G.add_edge(p1, p2, shared_cm=float(cm) if cm else 0.0)
+    if NX_BACKEND is not None:
+        components = [set(c) for c in nx.connected_components(G, backend=NX_BACKEND)]
+    elif igraph is None:
+        components = list(nx.connected_components(G))
+    else:
+        ig, ids = to_igraph(G)
+        components = [{ids[v] for v in comp} for comp in ig.connected_components()]
 
-    return G, people
+    _components_cache[G] = components
+    return components
 
 
 def calculate_density(G, nodes):
-    """Calculate density of a subgraph (edges present / edges possible)."""
-    subgraph = G.subgraph(nodes)
+    """Calculate density of a node set (edges present / edges possible)."""
     n = len(nodes)
     if n < 2:
         return 1.0
+    members = nodes if isinstance(nodes, (set, frozenset)) else set(nodes)
     possible_edges = n * (n - 1) / 2
-    actual_edges = subgraph.number_of_edges()
+    # Each internal edge is seen from both ends
+    actual_edges = sum(1 for u in members for v in G[u] if v in members) / 2
     return actual_edges / possible_edges
 
 
-def find_cliques(G, min_size=3, max_cliques=100):
-    """Find maximal cliques of at least min_size."""
+def ego_subgraph(G, seeds, radius=1):
+    """
+    Union of the radius-hop ego graphs around each seed node. Every clique
+    containing a seed lies entirely inside its 1-hop ego graph.
+    """
+    nodes = set()
+    for seed in seeds:
+        nodes.update(nx.single_source_shortest_path_length(G, seed, cutoff=radius))
+    return G.subgraph(nodes)
+
+
+def iter_cliques(G):
+    """
+    Yield maximal cliques of G as lists of nodes.
+    Uses NetworKit's C++ Eppstein-Strash enumeration when installed.
+    """
+    if nk is None:
+        yield from nx.find_cliques(G)
+        return
+
+    # nx2nk numbers nodes in G.nodes() order
+    ids = list(G.nodes())
+    mc = nk.clique.MaximalCliques(nk.nxadapter.nx2nk(G))
+    mc.run()
+    for clique in mc.getCliques():
+        yield [ids[v] for v in clique]
+
+
+def prune_small_components(G, min_size=3):
+    """Copy of G keeping only connected components with at least min_size nodes."""
+    big = [c for c in connected_components(G) if len(c) >= min_size]
+    H = G.subgraph(set().union(*big)).copy()
+    _components_cache[H] = big
+    return H
+
+
+def component_subgraphs(G, min_size=3):
+    """Copies of each connected component with at least min_size nodes, largest first."""
+    components = sorted(connected_components(G), key=len, reverse=True)
+    return [G.subgraph(c).copy() for c in components if len(c) >= min_size]
+
+
+# Component subgraphs inherited by forked pool workers, so they aren't pickled
+_pool_graphs = []
+
+# fork is only safe where it's the platform's own default: macOS documents it
+# as unsafe and Windows doesn't have it, so there workers are spawned instead
+FORK_POOL = sys.platform.startswith('linux')
+
+
+def _run_on_component(func, i):
+    return func(_pool_graphs[i])
+
+
+def map_components(func, subgraphs, workers=1):
+    """
+    Yield func(subgraph) for each component subgraph, in completion order.
+    With workers > 1 the components are spread over a process pool: forked
+    on Linux, otherwise spawned with each subgraph pickled to its worker.
+    """
+    global _pool_graphs
+    if workers <= 1 or len(subgraphs) <= 1:
+        yield from map(func, subgraphs)
+        return
+
+    processes = min(workers, len(subgraphs))
+    if not FORK_POOL:
+        with get_context().Pool(processes) as pool:
+            yield from pool.imap_unordered(func, subgraphs)
+        return
+
+    _pool_graphs = subgraphs
+    try:
+        with get_context('fork').Pool(processes) as pool:
+            yield from pool.imap_unordered(partial(_run_on_component, func), range(len(subgraphs)))
+    finally:
+        _pool_graphs = []
+
+
+def cliques_in(G, min_size=3, max_cliques=100):
+    """Find maximal cliques of at least min_size in a single graph."""
+    # islice stops pulling from the generator as soon as the cap is hit
+    large = (clique for clique in iter_cliques(G) if len(clique) >= min_size)
+    # Maximal cliques are fully connected by definition
+    return [{
+        'nodes': np.fromiter(clique, dtype=np.int32, count=len(clique)),
+        'size': len(clique),
+        'density': 1.0
+    } for clique in islice(large, max_cliques)]
+
+
+def find_cliques(G, min_size=3, max_cliques=100, workers=1):
+    """Find maximal cliques of at least min_size, one connected component at a time."""
+    func = partial(cliques_in, min_size=min_size, max_cliques=max_cliques)
     cliques = []
-    for i, clique in enumerate(nx.find_cliques(G)):
-        if len(clique) >= min_size:
-            density = calculate_density(G, clique)
-            cliques.append({
-                'nodes': set(clique),
-                'size': len(clique),
-                'density': density
-            })
+    for found in map_components(func, component_subgraphs(G, min_size), workers):
+        cliques.extend(found)
         if len(cliques) >= max_cliques:
             break
-    return cliques
+    return cliques[:max_cliques]
+
+
+# Louvain local-moving stops after this many passes, or once a pass
+# improves modularity by less than MIN_PASS_GAIN
+MAX_PASSES = 100
+MIN_PASS_GAIN = 1e-7
+
+
+def _local_move(indptr, indices, data, k, m2):
+    """
+    One Louvain level on a CSR adjacency: greedily move each node to the
+    neighbouring community with the best modularity gain until a pass gains
+    less than MIN_PASS_GAIN (ties and round-off can otherwise shuffle nodes
+    back and forth indefinitely), or after MAX_PASSES passes.
+    Returns (community per node, whether any node moved).
+    """
+    n = len(k)
+    comm = np.arange(n)
+    tot = k.copy()                    # total degree per community
+    weight_to = np.zeros(n)           # scratch: node's edge weight into each community
+    seen = np.zeros(n, dtype=np.bool_)
+    neighbours = np.empty(n, dtype=np.int64)
+    moved = False
+
+    for _ in range(MAX_PASSES):
+        pass_gain = 0.0
+        for i in range(n):
+            ci = comm[i]
+            ki = k[i]
+            count = 0
+            for p in range(indptr[i], indptr[i + 1]):
+                j = indices[p]
+                if j == i:
+                    continue
+                cj = comm[j]
+                if not seen[cj]:
+                    seen[cj] = True
+                    neighbours[count] = cj
+                    count += 1
+                weight_to[cj] += data[p]
+
+            tot[ci] -= ki
+            best = ci
+            stay_gain = weight_to[ci] - tot[ci] * ki / m2
+            best_gain = stay_gain
+            for q in range(count):
+                c = neighbours[q]
+                gain = weight_to[c] - tot[c] * ki / m2
+                if gain > best_gain + 1e-12:
+                    best = c
+                    best_gain = gain
+            tot[best] += ki
+            comm[i] = best
+
+            if best != ci:
+                pass_gain += best_gain - stay_gain
+                moved = True
+            for q in range(count):
+                c = neighbours[q]
+                seen[c] = False
+                weight_to[c] = 0.0
+            weight_to[ci] = 0.0
+        # Gains are in edge-weight units; 2 * gain / m2 is the modularity change
+        if 2.0 * pass_gain / m2 < MIN_PASS_GAIN:
+            break
+    return comm, moved
+
+
+if njit is not None:
+    _local_move = njit(cache=True)(_local_move)
+
+
+def louvain_csr(A):
+    """
+    Multi-level Louvain on a symmetric scipy CSR adjacency matrix, with the
+    local-moving kernel compiled by numba. Returns a community label per row.
+    """
+    membership = np.arange(A.shape[0])
+    while True:
+        A = scipy.sparse.csr_matrix(A)
+        k = np.asarray(A.sum(axis=1), dtype=np.float64).ravel()
+        m2 = k.sum()
+        if m2 == 0:
+            break
+        comm, moved = _local_move(A.indptr, A.indices, A.data.astype(np.float64), k, m2)
+        if not moved:
+            break
+        # Collapse each community into a single node and go up a level
+        _, comm = np.unique(comm, return_inverse=True)
+        if comm.max() + 1 == A.shape[0]:
+            break  # Nodes moved but no communities merged; another level would repeat this one
+        membership = comm[membership]
+        P = scipy.sparse.csr_matrix((np.ones(len(comm)), (np.arange(len(comm)), comm)))
+        A = P.T @ A @ P
+    return membership
+
+
+def group_by_label(nodes, labels):
+    """Group int nodes into arrays by community label with one stable argsort."""
+    nodes = np.fromiter(nodes, dtype=np.int64)
+    labels = np.fromiter(labels, dtype=np.int64)
+    order = np.argsort(labels, kind='stable')
+    boundaries = np.flatnonzero(np.diff(labels[order])) + 1
+    return np.split(nodes[order], boundaries)
+
+
+def partition_graph(G):
+    """
+    Partition G into communities, returning a list of node collections.
+    Prefers GPU Louvain (nx-cugraph), then Leiden (leidenalg), then igraph's
+    C Louvain, then numba Louvain on a CSR matrix, then networkx's Louvain,
+    then python-louvain, then greedy modularity.
+    """
+    if NX_BACKEND is not None:
+        return [set(c) for c in nx.community.louvain_communities(
+            G, weight='shared_cm', backend=NX_BACKEND)]
+
+    if igraph is not None:
+        ig, nodes = to_igraph(G)
+        if leidenalg is not None:
+            clustering = leidenalg.find_partition(
+                ig, leidenalg.ModularityVertexPartition, weights='weight', n_iterations=-1)
+        else:
+            clustering = ig.community_multilevel(weights='weight')
+        return [{nodes[v] for v in members} for members in clustering]
+
+    if njit is not None:
+        nodes = list(G.nodes())
+        A = nx.to_scipy_sparse_array(G, nodelist=nodes, weight='shared_cm', format='csr')
+        return group_by_label(nodes, louvain_csr(A))
 
+    try:
+        from networkx.algorithms.community import louvain_communities
+        return [set(c) for c in louvain_communities(G, weight='shared_cm')]
+    except ImportError:
+        pass
 
-def find_communities(G, min_size=3):
-    """Find communities using Louvain algorithm."""
     try:
         import community.community_louvain as community_louvain
-        partition = community_louvain.best_partition(G, weight='shared_cm')
-
-        # Group by community
-        communities_dict = defaultdict(set)
-        for node, comm_id in partition.items():
-            communities_dict[comm_id].add(node)
-
-        communities = []
-        for comm_id, nodes in communities_dict.items():
-            if len(nodes) >= min_size:
-                density = calculate_density(G, nodes)
-                communities.append({
-                    'nodes': nodes,
-                    'size': len(nodes),
-                    'density': density
-                })
-        return communities
     except ImportError:
         # Fall back to greedy modularity
         from networkx.algorithms.community import greedy_modularity_communities
-        communities = []
-        for community in greedy_modularity_communities(G):
-            if len(community) >= min_size:
-                density = calculate_density(G, community)
-                communities.append({
-                    'nodes': set(community),
-                    'size': len(community),
-                    'density': density
-                })
-        return communities
-
-
-def get_display_name(node, people):
-    """Get display name for a node."""
-    if node in people:
-        name = people[node]['name']
-        if node == CHRIS_ID:
-            return f"[{name}]"  # Brackets for test-taker
-        return name
-    return node[:8] + "..."
-
-
-def print_cliques(cliques, people, limit=20):
+        return [set(c) for c in greedy_modularity_communities(G)]
+
+    partition = community_louvain.best_partition(G, weight='shared_cm')
+    return group_by_label(partition.keys(), partition.values())
+
+
+def communities_in(G, min_size=3):
+    """Find communities of at least min_size in a single graph."""
+    communities = []
+    for nodes in partition_graph(G):
+        if len(nodes) >= min_size:
+            density = calculate_density(G, nodes)
+            communities.append({
+                'nodes': np.fromiter(nodes, dtype=np.int32, count=len(nodes)),
+                'size': len(nodes),
+                'density': density
+            })
+    return communities
+
+
+def find_communities(G, min_size=3, workers=1):
+    """Find communities using Leiden/Louvain, one connected component at a time."""
+    func = partial(communities_in, min_size=min_size)
+    communities = []
+    for found in map_components(func, component_subgraphs(G, min_size), workers):
+        communities.extend(found)
+    return communities
+
+
+def display_name_array(names, chris=None):
+    """
+    Precompute every node's display name once, so printers only index into it.
+    The test-taker is shown in brackets.
+    """
+    display = names.copy()
+    if chris is not None:
+        display[chris] = f"[{names[chris]}]"
+    return display
+
+
+def print_members(nodes, display, shown=10):
+    """Print the first few member names alphabetically, without sorting them all."""
+    for name in heapq.nsmallest(shown, display[nodes]):
+        print(f"  - {name}")
+    if len(nodes) > shown:
+        print(f"  ... and {len(nodes) - shown} more")
+
+
+def print_cliques(cliques, display, limit=20):
     """Print cliques with their members."""
     print("\n" + "=" * 60)
     print(f"CLIQUES (fully connected groups) - showing top {limit}")
     print("=" * 60)
 
-    # Sort by size descending
-    cliques_sorted = sorted(cliques, key=lambda x: x['size'], reverse=True)[:limit]
+    # Largest first
+    cliques_sorted = heapq.nlargest(limit, cliques, key=itemgetter('size'))
 
     for i, clique in enumerate(cliques_sorted, 1):
-        names = sorted([get_display_name(n, people) for n in clique['nodes']])
         print(f"\nClique {i}: {clique['size']} members")
+        print_members(clique['nodes'], display)
 
-        # Show first 10 members
-        for name in names[:10]:
-            print(f"  - {name}")
-        if len(names) > 10:
-            print(f"  ... and {len(names) - 10} more")
 
-
-def print_communities(communities, people, limit=20):
+def print_communities(communities, display, chris=None, limit=20):
     """Print communities with their members."""
     print("\n" + "=" * 60)
-    print(f"COMMUNITIES (Louvain clusters) - showing top {limit}")
+    print(f"COMMUNITIES (Leiden/Louvain clusters) - showing top {limit}")
     print("=" * 60)
 
-    # Sort by size descending
-    communities_sorted = sorted(communities, key=lambda x: x['size'], reverse=True)[:limit]
+    # Largest first
+    communities_sorted = heapq.nlargest(limit, communities, key=itemgetter('size'))
 
     for i, comm in enumerate(communities_sorted, 1):
-        names = sorted([get_display_name(n, people) for n in comm['nodes']])
-        has_chris = CHRIS_ID in comm['nodes']
+        has_chris = chris is not None and chris in comm['nodes']
         marker = " ★" if has_chris else ""
 
         print(f"\nCommunity {i}: {comm['size']} members, density={comm['density']:.3f}{marker}")
-
-        # Show first 10 members
-        for name in names[:10]:
-            print(f"  - {name}")
-        if len(names) > 10:
-            print(f"  ... and {len(names) - 10} more")
+        print_members(comm['nodes'], display)
 
 
-def analyze_components(G, people):
+def analyze_components(G, display):
     """Analyze connected components."""
-    components = list(nx.connected_components(G))
+    components = connected_components(G)
+    chris = G.graph.get('chris')
 
     print("\n" + "=" * 60)
     print("CONNECTED COMPONENTS")
     print("=" * 60)
     print(f"Total components: {len(components)}")
 
-    # Sort by size
-    components_sorted = sorted(components, key=len, reverse=True)
-
-    for i, comp in enumerate(components_sorted[:10], 1):
-        has_chris = CHRIS_ID in comp
+    # Largest first
+    for i, comp in enumerate(heapq.nlargest(10, components, key=len), 1):
+        has_chris = chris in comp
         marker = " ★ (main component)" if has_chris else ""
-        sample = [get_display_name(n, people) for n in list(comp)[:3]]
+        sample = display[list(comp)[:3]]
         print(f"  {i}. {len(comp):,} nodes{marker}")
         print(f"     Sample: {', '.join(sample)}")
 
@@ -196,8 +550,16 @@ def main():
     parser = argparse.ArgumentParser(description="DNA Match Clustering Tool")
     parser.add_argument("--min-cm", type=float, default=20, help="Minimum cM for edges (default: 20)")
     parser.add_argument("--min-size", type=int, default=3, help="Minimum cluster size (default: 3)")
+    parser.add_argument("--min-component-size", type=int,
+                        help="Skip components smaller than this for communities/cliques (default: --min-size)")
+    parser.add_argument("--min-degree", type=int, default=2,
+                        help="Drop people with fewer matches above --min-cm (default: 2)")
     parser.add_argument("--no-cliques", action="store_true", help="Skip clique finding (slow on large graphs)")
+    parser.add_argument("--ego-only", action=argparse.BooleanOptionalAction, default=True,
+                        help="Only search cliques among Chris and their direct matches (default: on)")
     parser.add_argument("--limit", type=int, default=20, help="Max results to show (default: 20)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Processes for per-component clustering (default: CPU count)")
     args = parser.parse_args()
 
     print("=" * 60)
@@ -208,26 +570,38 @@ def main():
     conn = psycopg2.connect(**DB_CONFIG)
     cursor = conn.cursor()
 
-    print(f"Building graph (min_cm={args.min_cm})...")
-    G, people = build_graph(cursor, min_cm=args.min_cm)
+    print(f"Building graph (min_cm={args.min_cm}, min_degree={args.min_degree})...")
+    G, names = build_graph(cursor, min_cm=args.min_cm, min_degree=args.min_degree)
     print(f"  Nodes: {G.number_of_nodes():,}")
     print(f"  Edges: {G.number_of_edges():,}")
 
     # Analyze components
-    analyze_components(G, people)
+    chris = G.graph['chris']
+    display = display_name_array(names, chris)
+    analyze_components(G, display)
+
+    # Drop small components before the expensive searches
+    min_component_size = args.min_component_size or args.min_size
+    G = prune_small_components(G, min_component_size)
+    print(f"\nKept {G.number_of_nodes():,} nodes in components of size >= {min_component_size}")
 
     # Find communities
     print("\nFinding communities...")
-    communities = find_communities(G, min_size=args.min_size)
+    communities = find_communities(G, min_size=args.min_size, workers=args.workers)
     print(f"  Found {len(communities)} communities of size >= {args.min_size}")
-    print_communities(communities, people, limit=args.limit)
+    print_communities(communities, display, chris, limit=args.limit)
 
     # Find cliques (optional, can be slow)
     if not args.no_cliques:
-        print("\nFinding cliques (this may take a while)...")
-        cliques = find_cliques(G, min_size=args.min_size, max_cliques=100)
+        clique_graph = G
+        if args.ego_only and chris is not None and chris in G:
+            clique_graph = ego_subgraph(G, [chris])
+            print(f"\nFinding cliques in Chris's ego graph ({clique_graph.number_of_nodes():,} nodes)...")
+        else:
+            print("\nFinding cliques (this may take a while)...")
+        cliques = find_cliques(clique_graph, min_size=args.min_size, max_cliques=100, workers=args.workers)
         print(f"  Found {len(cliques)} cliques of size >= {args.min_size}")
-        print_cliques(cliques, people, limit=args.limit)
+        print_cliques(cliques, display, limit=args.limit)
 
     cursor.close()
     conn.close()
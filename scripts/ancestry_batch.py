@@ -31,6 +31,9 @@ from pathlib import Path
 
 SESSIONS_ROOT = Path.home() / ".ancestry-scraper" / "sessions"
 ANCESTRY_BASE_URL = "https://www.ancestry.co.uk"
+GUID_RE = re.compile(
+    r"/([A-F0-9]{8}-[A-F0-9]{4}-[A-F0-9]{4}-[A-F0-9]{4}-[A-F0-9]{12})", re.IGNORECASE
+)
 SOURCE = "ancestry.co.uk"
 SCHEMA_VERSION = 1
 EVENT_TYPE = "MatchObserved"
@@ -40,6 +43,18 @@ MAX_CONSECUTIVE_EMPTY_PAGES = 10
 # Hard safety stop in case pagination never terminates.
 MAX_PAGES = 1500
 
+# Requests the extractor never reads - aborting them keeps each page load light.
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+BLOCKED_URL_PARTS = (
+    "google-analytics",
+    "googletagmanager",
+    "doubleclick",
+    "adobedtm",
+    "optimizely",
+    "newrelic",
+    "cdn.segment.com",
+)
+
 
 # --------------------------------------------------------------------------- #
 # SessionStore - owns checkpoint.json + events.jsonl for a single session.
@@ -406,6 +421,17 @@ def _get_chrome_cookies():
     return cookies
 
 
+def _block_nonessential(route):
+    """context.route handler that aborts images, fonts, media and tracking beacons."""
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or any(
+        part in request.url for part in BLOCKED_URL_PARTS
+    ):
+        route.abort()
+    else:
+        route.continue_()
+
+
 def _navigate_and_extract(page, base_url, page_num):
     """Navigate to a single Ancestry match-list page and pull match dicts.
     Retries 3 times. Returns the extracted list (possibly empty) on success,
@@ -425,11 +451,7 @@ def _navigate_and_extract(page, base_url, page_num):
 def _resolve_test_guid(page):
     page.goto(f"{ANCESTRY_BASE_URL}/dna", wait_until="domcontentloaded", timeout=60000)
     time.sleep(2)
-    match = re.search(
-        r"/([A-F0-9]{8}-[A-F0-9]{4}-[A-F0-9]{4}-[A-F0-9]{4}-[A-F0-9]{12})",
-        page.url,
-        re.IGNORECASE,
-    )
+    match = GUID_RE.search(page.url)
     if not match:
         raise SessionError(
             "Could not detect DNA test GUID from /dna redirect. "
@@ -474,7 +496,10 @@ def scrape(store, headless=False, max_pages=MAX_PAGES):
 
         browser = pw.chromium.launch(
             headless=headless,
-            args=["--disable-blink-features=AutomationControlled"],
+            args=[
+                "--disable-blink-features=AutomationControlled",
+                "--blink-settings=imagesEnabled=false",
+            ],
         )
         context = browser.new_context(
             user_agent=(
@@ -483,6 +508,7 @@ def scrape(store, headless=False, max_pages=MAX_PAGES):
                 "Chrome/120.0.0.0 Safari/537.36"
             ),
         )
+        context.route("**/*", _block_nonessential)
         context.add_cookies(cookies)
         page = context.new_page()
 
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Ancestry Browser Daemon - keeps a warm Chromium running for the importer.
+
+Launching Chromium is the slowest part of a browser-mode import. This script
+launches it once with remote debugging enabled and writes the CDP websocket
+endpoint to CDP_ENDPOINT_PATH. ancestry_import.py connects to it with
+connect_over_cdp() and opens a fresh BrowserContext (its own cookie jar) per
+run, falling back to launching its own browser when the daemon isn't running.
+
+Usage:
+    python ancestry_browser_daemon.py              # run until Ctrl+C
+    python ancestry_browser_daemon.py --headed     # show the browser window
+"""
+
+import argparse
+import json
+import sys
+import time
+import urllib.request
+from pathlib import Path
+
+
+CDP_ENDPOINT_PATH = Path("/tmp/ancestry_cdp_endpoint")
+DEFAULT_PORT = 9222
+
+
+def wait_for_endpoint(port, timeout=15):
+    """Poll Chromium's /json/version until it reports its websocket endpoint."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/json/version", timeout=2) as response:
+                return json.load(response)["webSocketDebuggerUrl"]
+        except (OSError, KeyError, ValueError):
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keep a warm Chromium for ancestry_import.py")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Remote debugging port")
+    parser.add_argument("--headed", action="store_true", help="Show the browser window")
+    args = parser.parse_args(argv)
+
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(
+            headless=not args.headed,
+            args=[
+                "--disable-blink-features=AutomationControlled",
+                f"--remote-debugging-port={args.port}",
+            ],
+        )
+        endpoint = wait_for_endpoint(args.port)
+        CDP_ENDPOINT_PATH.write_text(endpoint)
+        print(f"Chromium ready at {endpoint}", flush=True)
+        print(f"Endpoint written to {CDP_ENDPOINT_PATH}; Ctrl+C to stop.", flush=True)
+
+        try:
+            while browser.is_connected():
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print("\nShutting down...")
+        finally:
+            CDP_ENDPOINT_PATH.unlink(missing_ok=True)
+            if browser.is_connected():
+                browser.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,62 +11,356 @@ Usage:
 """
 
 import sqlite3
+import argparse
+import asyncio
+import contextlib
+import functools
+import hashlib
+import http.cookiejar
+import itertools
 import json
+import math
 import sys
 import time
+import traceback
 import re
 import os
+import queue
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
 import requests
 import browser_cookie3
 
+# orjson decodes the in-page extraction payloads faster when it's installed
+try:
+    from orjson import loads as loads_json
+except ImportError:
+    loads_json = json.loads
+
 # Configuration
 DB_PATH = Path(__file__).parent.parent / "genealogy.db"
 ANCESTRY_BASE_URL = "https://www.ancestry.co.uk"
 CHROME_USER_DATA = Path.home() / "Library/Application Support/Google/Chrome"
+GUID_CACHE_PATH = Path(__file__).parent.parent / ".ancestry_guid"
+# Playwright storage state (cookies + localStorage), saved when a browser run
+# ends and loaded into the next one's context; --no-persist turns this off
+STORAGE_STATE_PATH = Path(__file__).parent.parent / ".ancestry_state.json"
+PERSIST_STORAGE_STATE = True
+
+# Test/match GUID in an Ancestry URL path, e.g. /dna/insights/E756DE6C-0C8D-443B-8793-ADDB6F35FD6A
+GUID_RE = re.compile(r'/([A-F0-9]{8}-[A-F0-9]{4}-[A-F0-9]{4}-[A-F0-9]{4}-[A-F0-9]{12})', re.IGNORECASE)
+# Written by ancestry_browser_daemon.py while its warm Chromium is running
+CDP_ENDPOINT_PATH = Path("/tmp/ancestry_cdp_endpoint")
+# Set by --cdp-endpoint to attach to a Chromium started some other way
+CDP_ENDPOINT = None
+
+# Chromium flags that cut process, GPU and background work for automated runs
+CHROMIUM_ARGS = [
+    "--disable-blink-features=AutomationControlled",
+    # Don't even request images; block_nonessential still catches anything else
+    "--blink-settings=imagesEnabled=false",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-renderer-backgrounding",
+    "--disable-component-extensions-with-background-pages",
+]
+# Added by --container, for root/CI setups where Chromium can't sandbox itself.
+# Never on by default: the browser carries real Ancestry cookies.
+CONTAINER_CHROMIUM_ARGS = ["--no-sandbox", "--no-zygote"]
+
+# Requests the match list scrape never needs: aborting them keeps page loads light.
+# Stylesheets stay: the shared-match extractor scrolls by layout height.
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+BLOCKED_URL_PARTS = ("google-analytics", "doubleclick", "adobedtm", "optimizely", "newrelic", "cdn.segment.com")
+
+# Side labels as shown in the match list UI, keyed by parse_match_side() result
+SIDE_LABELS = {"paternal": "Paternal", "maternal": "Maternal", "both": "Both sides"}
+# Side text to look for in a scraped matchSide, in the order it's checked
+SIDE_TEXTS = (("Paternal", "paternal"), ("Maternal", "maternal"), ("Both sides", "both"),
+              ("Parent 1", "parent1"), ("Parent 2", "parent2"))
+SIDE_BY_TEXT = dict(SIDE_TEXTS)
+
+
+def api_match_to_scraped(match):
+    """Reshape a matches-list API match into the dict format the DOM extractor returns."""
+    rel_data = match.get("relationship") or {}
+    tree_info = match.get("treeInfo") or match.get("linkedTree") or {}
+    guid = match.get("testGuid")
+    return {
+        'guid': guid.upper() if guid else None,
+        'name': match.get("displayName") or match.get("publicDisplayName"),
+        'sharedCm': rel_data.get("sharedCentimorgans"),
+        'relationship': match.get("relationshipLabel"),
+        'matchSide': SIDE_LABELS.get(parse_match_side(match)),
+        'hasTree': bool(tree_info) or match.get("hasLinkedTree", False),
+        'treeSize': tree_info.get("treeSize") or tree_info.get("personCount"),
+        'linkedTreeId': tree_info.get("treeId"),
+    }
+
+
+def guid_key(guid):
+    """
+    Compact key for a seen-GUIDs set: the GUID's 128-bit int, which hashes
+    faster and takes less memory than the 36-char string. Falls back to the
+    string for anything that isn't a UUID. Parsed with int() directly, which
+    is several times cheaper than building a uuid.UUID.
+    """
+    digits = guid.replace('-', '')
+    if len(digits) == 32:
+        try:
+            return int(digits, 16)
+        except ValueError:
+            pass
+    return guid
+
+
+def api_page_to_scraped(data):
+    """All matches on one matches-list API page, reshaped by api_match_to_scraped."""
+    return [api_match_to_scraped(m)
+            for group in data.get("matchGroups", [])
+            for m in group.get("matches", [])]
+
+
+def side_from_text(side_text):
+    """Classify a scraped matchSide label as paternal/maternal/both/parent1/parent2/unknown."""
+    if not side_text:
+        return 'unknown'
+    # API matches carry the exact SIDE_LABELS text, so try a plain lookup first
+    side = SIDE_BY_TEXT.get(side_text)
+    if side is None:
+        side = next((value for text, value in SIDE_TEXTS if text in side_text), 'unknown')
+    return side
+
+
+def format_scraped_match(m):
+    """Convert a scraped match dict into the format import_browser_matches expects."""
+    return {
+        'name': m.get('name'),
+        'shared_cm': m.get('sharedCm'),
+        'predicted_relationship': m.get('relationship'),
+        'ancestry_id': m.get('guid'),
+        'match_side': side_from_text(m.get('matchSide')),
+        'tree_size': m.get('treeSize'),
+        'has_tree': m.get('hasTree', False),
+        'linked_tree_id': m.get('linkedTreeId')
+    }
+
+
+def _is_nonessential(request):
+    return request.resource_type in BLOCKED_RESOURCE_TYPES or any(part in request.url for part in BLOCKED_URL_PARTS)
+
+
+def block_nonessential(route):
+    """context.route handler that aborts images, fonts, media and tracking beacons."""
+    if _is_nonessential(route.request):
+        route.abort()
+    else:
+        route.continue_()
+
+
+async def block_nonessential_async(route):
+    """Async-API version of block_nonessential, for the scan contexts."""
+    if _is_nonessential(route.request):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+def saved_storage_state():
+    """The storage state from the last run, for new_context(storage_state=...)."""
+    if PERSIST_STORAGE_STATE and STORAGE_STATE_PATH.exists():
+        return str(STORAGE_STATE_PATH)
+    return None
+
+
+def save_storage_state(context):
+    """Save a sync-API context's storage state for the next run."""
+    if not PERSIST_STORAGE_STATE:
+        return
+    try:
+        context.storage_state(path=str(STORAGE_STATE_PATH))
+    except Exception as e:
+        print(f"  Warning: couldn't save browser state: {e}", flush=True)
+
+
+def cdp_endpoint():
+    """The running browser to attach to: --cdp-endpoint, else the daemon's, else None."""
+    if CDP_ENDPOINT:
+        return CDP_ENDPOINT
+    try:
+        return CDP_ENDPOINT_PATH.read_text().strip() or None
+    except OSError:
+        return None
+
+
+def forget_cdp_endpoint(endpoint):
+    """
+    Delete the daemon's endpoint file after a failed connect to the endpoint it
+    holds: a daemon that was killed outright leaves it behind, and every later
+    run would otherwise wait out the connect timeout before launching.
+    """
+    if endpoint == CDP_ENDPOINT:
+        return  # Given with --cdp-endpoint, not read from the file
+    with contextlib.suppress(OSError):
+        if CDP_ENDPOINT_PATH.read_text().strip() == endpoint:
+            CDP_ENDPOINT_PATH.unlink()
+
+
+def launch_browser(p, headless=True):
+    """
+    Connect to the browser at cdp_endpoint() if there is one, otherwise launch
+    a fresh one. Callers should open their own context with
+    browser.new_context(); closing a connected browser only disconnects from it.
+    """
+    endpoint = cdp_endpoint()
+    if endpoint:
+        try:
+            browser = p.chromium.connect_over_cdp(endpoint, timeout=5000)
+            print(f"Connected to warm browser at {endpoint}", flush=True)
+            return browser
+        except Exception as e:
+            print(f"  Couldn't connect to {endpoint} ({e})", flush=True)
+            forget_cdp_endpoint(endpoint)
+
+    # Launch a fresh browser (not using Chrome profile to avoid lock issues)
+    print("Launching browser...", flush=True)
+    return p.chromium.launch(headless=headless, args=CHROMIUM_ARGS)
 
 
-def fetch_matches_with_browser(test_guid=None, headless=False, limit=10000):
+async def launch_browser_async(p, headless=True):
+    """launch_browser for the async Playwright API."""
+    endpoint = cdp_endpoint()
+    if endpoint:
+        try:
+            browser = await p.chromium.connect_over_cdp(endpoint, timeout=5000)
+            print(f"Connected to warm browser at {endpoint}", flush=True)
+            return browser
+        except Exception as e:
+            print(f"  Couldn't connect to {endpoint} ({e})", flush=True)
+            forget_cdp_endpoint(endpoint)
+
+    return await p.chromium.launch(headless=headless, args=CHROMIUM_ARGS)
+
+
+# Match list extractor, installed in every page with context.add_init_script so
+# each page's extraction is a short window.__extractMatches() call rather than
+# sending and compiling the whole script again. Returns parallel arrays (one per
+# field) rather than an object per match, already JSON-encoded: one string
+# crosses CDP instead of Playwright serializing every value separately.
+EXTRACT_MATCHES_JS = """
+    window.__extractMatches = () => {
+        const GUID_RE = /with\\/([A-F0-9-]+)/i;
+        // Leading digit so a stray comma can't match
+        const CM_RE = /(\\d[\\d,]*)\\s*cM/i;
+        // CM_RE and SIZE_RE capture only digits and commas ("1,234"), so read
+        // them with a plain digit loop rather than strip + parseFloat/parseInt
+        const toInt = (s) => {
+            let v = 0;
+            for (let i = 0; i < s.length; i++) {
+                const d = s.charCodeAt(i) - 48;
+                if (d >= 0 && d <= 9) v = v * 10 + d;
+            }
+            return v;
+        };
+        const SIZE_RE = /(\\d[\\d,]*)\\s*pe/i;
+        const TREE_ID_RE = /tree\\/(\\d+)/;
+        // Everything read from an entry, found in one walk of its subtree
+        const PARTS = 'a.matchInfoName[aria-label], [data-testid="sharedDNA"], .matchTreeInfo, '
+                      + '.relationshipLabel, .familySideInfo';
+        const text = (el) => el ? el.textContent.trim() : null;
+        const cols = {guid: [], name: [], sharedCm: [], relationship: [], matchSide: [],
+                      hasTree: [], treeSize: [], linkedTreeId: []};
+
+        // Updated selector for current Ancestry page structure
+        for (const entry of document.querySelectorAll('.matchEntry')) {
+            // Document order, so each keeps the first match as querySelector would
+            let nameLink = null, cmEl = null, treeInfo = null, relEl = null, sideEl = null;
+            for (const el of entry.querySelectorAll(PARTS)) {
+                const cl = el.classList;
+                if (cl.contains('matchInfoName') && el.tagName === 'A' && el.hasAttribute('aria-label')) nameLink ??= el;
+                if (el.getAttribute('data-testid') === 'sharedDNA') cmEl ??= el;
+                if (cl.contains('matchTreeInfo')) treeInfo ??= el;
+                if (cl.contains('relationshipLabel')) relEl ??= el;
+                if (cl.contains('familySideInfo')) sideEl ??= el;
+            }
+
+            // Name link - 2026 UI: matchInfoName link carries aria-label and visible text
+            const guidMatch = nameLink && GUID_RE.exec(nameLink.href);
+            if (!guidMatch) continue;
+
+            // cM - from the sharedDNA testid, else any text containing cM
+            const cmMatch = CM_RE.exec(cmEl ? cmEl.textContent : entry.textContent);
+
+            // Tree info - look for tree link in matchTreeInfo
+            let hasTree = false, treeSize = null, linkedTreeId = null;
+            if (treeInfo) {
+                const treeLink = treeInfo.querySelector('a[href*="family-tree"]');
+                const treeText = treeInfo.textContent;
+                let sizeText = null;
+                if (treeLink) {
+                    hasTree = true;
+                    sizeText = treeLink.textContent;
+                    const treeIdMatch = TREE_ID_RE.exec(treeLink.href);
+                    if (treeIdMatch) linkedTreeId = treeIdMatch[1];
+                } else if (treeText.includes('Unlinked tree') || treeText.includes('Public linked tree')) {
+                    hasTree = true;
+                    sizeText = treeText;
+                }
+                const sizeMatch = sizeText && SIZE_RE.exec(sizeText);
+                if (sizeMatch) treeSize = toInt(sizeMatch[1]);
+            }
+
+            cols.guid.push(guidMatch[1].toUpperCase());
+            cols.name.push(nameLink.textContent.trim());
+            cols.sharedCm.push(cmMatch ? toInt(cmMatch[1]) : null);
+            cols.relationship.push(text(relEl));
+            cols.matchSide.push(text(sideEl));
+            cols.hasTree.push(hasTree);
+            cols.treeSize.push(treeSize);
+            cols.linkedTreeId.push(linkedTreeId);
+        }
+        return JSON.stringify(cols);
+    };
+"""
+MATCH_FIELDS = ('guid', 'name', 'sharedCm', 'relationship', 'matchSide',
+                'hasTree', 'treeSize', 'linkedTreeId')
+
+
+def fetch_matches_with_browser(test_guid=None, headless=True, limit=10000, debug=False, known_guids=frozenset(),
+                               start_page=1, progress=None):
     """
     Use Playwright to scrape DNA matches from Ancestry website.
     This bypasses the 200-match API limit by using actual browser automation.
 
     Args:
         test_guid: Optional test GUID (will be auto-detected if not provided)
-        headless: Run browser in headless mode (default False so you can see it working)
+        headless: Run browser in headless mode (pass False to watch it work)
         limit: Maximum number of matches to fetch
-
-    Returns:
-        List of match dictionaries
+        debug: Save a screenshot and the match list HTML to /tmp for debugging selectors
+        known_guids: guid_keys of matches already imported (see load_known_guids);
+            they count towards the walk but aren't yielded again
+        start_page: First match list page to load, to resume an interrupted walk
+        progress: Optional dict, kept up to date with 'page' (the last list page
+            that it and every page before it have been read and yielded) and
+            'done' (set once the whole list has been collected)
+
+    Yields:
+        One list of new match dictionaries (import_browser_matches format) per
+        page, so callers can write them out as they arrive
     """
-    from playwright.sync_api import sync_playwright
+    from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
 
     print("\n" + "=" * 60)
     print("BROWSER AUTOMATION MODE (Playwright)")
     print("=" * 60)
 
-    matches = []
-
     # Get cookies from browser first
     print("\nExtracting cookies from Chrome...", flush=True)
-    cookie_list = []
-
-    # Try both .co.uk and .com domains
-    for domain in [".ancestry.co.uk", ".ancestry.com"]:
-        try:
-            cookies = browser_cookie3.chrome(domain_name=domain)
-            for cookie in cookies:
-                cookie_list.append({
-                    "name": cookie.name,
-                    "value": cookie.value,
-                    "domain": cookie.domain,
-                    "path": cookie.path,
-                    "secure": bool(cookie.secure),
-                })
-        except Exception as e:
-            print(f"  Warning: {domain}: {e}")
+    cookie_list = list(_playwright_cookies())
 
     print(f"  Found {len(cookie_list)} Ancestry cookies", flush=True)
 
@@ -80,115 +374,199 @@ def fetch_matches_with_browser(test_guid=None, headless=False, limit=10000):
         print("  3. CLOSE Chrome completely (Cmd+Q)")
         print("  4. Run this script again")
         print("\nNote: Cookies may have been cleared by a previous run.")
-        return []
+        return
 
+    if progress is None:
+        progress = {}
+    progress.update(page=start_page - 1, done=False)
+    list_pages = False  # Set when the match list has to be walked by URL
     with sync_playwright() as p:
-        # Launch a fresh browser (not using Chrome profile to avoid lock issues)
-        print("\nLaunching browser...", flush=True)
-
-        browser = p.chromium.launch(
-            headless=headless,
-            args=["--disable-blink-features=AutomationControlled"],
-        )
+        browser = launch_browser(p, headless=headless)
         context = browser.new_context(
-            user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+            user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+            service_workers="block",
+            storage_state=saved_storage_state(),
         )
+        # Only the match text and the matches-list API are used
+        context.route("**/*", block_nonessential)
+        context.add_init_script(EXTRACT_MATCHES_JS)
 
         # Add cookies to the browser context
         print("Injecting cookies...", flush=True)
         context.add_cookies(cookie_list)
 
-        page = context.pages[0] if context.pages else context.new_page()
+        page = context.new_page()
+
+        # Total match count the matches-list API reports, so pagination can
+        # stop once it's reached
+        reported = {"total": 0}
+
+        def on_response(response):
+            if "/matches/list" not in response.url or response.status != 200:
+                return
+            try:
+                data = response.json()
+            except Exception:
+                return
+            reported["total"] = data.get("totalMatches") or reported["total"]
+
+        page.on("response", on_response)
+
+        def is_matches_list(response):
+            return "/matches/list" in response.url and response.status == 200
 
         try:
-            # Navigate to DNA section first (to get redirected to correct URL with GUID)
-            print("Navigating to DNA section...", flush=True)
-            page.goto(f"{ANCESTRY_BASE_URL}/dna", wait_until="domcontentloaded", timeout=60000)
-            time.sleep(2)
+            if not test_guid:
+                # Navigate to DNA section first (to get redirected to correct URL with GUID)
+                print("Navigating to DNA section...", flush=True)
+                page.goto(f"{ANCESTRY_BASE_URL}/dna", wait_until="domcontentloaded", timeout=60000)
+                try:
+                    page.wait_for_url(GUID_RE, timeout=10000)
+                except PlaywrightTimeoutError:
+                    pass  # No redirect to a test URL; carry on without a GUID
 
-            print(f"Redirected to: {page.url}", flush=True)
+                print(f"Redirected to: {page.url}", flush=True)
 
-            # Extract test GUID from URL
-            guid_match = re.search(r'/([A-F0-9]{8}-[A-F0-9]{4}-[A-F0-9]{4}-[A-F0-9]{4}-[A-F0-9]{12})',
-                                   page.url, re.IGNORECASE)
-            if guid_match:
-                test_guid = guid_match.group(1).upper()
-                print(f"Found test GUID: {test_guid}", flush=True)
+                # Extract test GUID from URL
+                guid_match = GUID_RE.search(page.url)
+                if guid_match:
+                    test_guid = guid_match.group(1).upper()
+                    print(f"Found test GUID: {test_guid}", flush=True)
 
             # Now navigate to the matches page using the correct URL structure
             # Try clicking on DNA Matches link or navigate directly
             matches_url = f"{ANCESTRY_BASE_URL}/discoveryui-matches/match-list/{test_guid}" if test_guid else f"{ANCESTRY_BASE_URL}/dna"
             print(f"Navigating to matches: {matches_url}...", flush=True)
-            page.goto(matches_url, wait_until="domcontentloaded", timeout=60000)
-            time.sleep(3)
+            # Returns as soon as the first matches-list XHR lands rather than after a fixed sleep
+            try:
+                with page.expect_response(is_matches_list, timeout=30000):
+                    page.goto(matches_url, wait_until="domcontentloaded", timeout=60000)
+            except PlaywrightTimeoutError:
+                print("  No matches-list response seen, falling back to the page content", flush=True)
 
             print(f"Current URL: {page.url}", flush=True)
 
             # Save screenshot for debugging
-            page.screenshot(path="/tmp/ancestry_debug.png")
-            print("Saved screenshot to /tmp/ancestry_debug.png", flush=True)
+            if debug:
+                page.screenshot(path="/tmp/ancestry_debug.png")
+                print("Saved screenshot to /tmp/ancestry_debug.png", flush=True)
 
             # Check if we're logged in (look for matches or login page)
             if "sign-in" in page.url.lower() or "login" in page.url.lower():
                 print("\n⚠️  Not logged in! Please log into Ancestry in Chrome first.")
                 print("   Then close Chrome and run this script again.")
-                context.close()
-                browser.close()
-                return []
+                return
 
             # Wait for matches to load - use wait_for_selector instead of fixed sleep
             print("Waiting for matches to load...", flush=True)
             try:
                 # Wait for either a match entry OR pagination element to appear
                 page.wait_for_selector('.matchEntry, ui-pagination[data-testid="paginator"], .matchGroupList', timeout=30000)
-                print("  Match content detected, waiting for full render...", flush=True)
-                time.sleep(3)  # Additional wait for JS to finish rendering
+                print("  Match content detected", flush=True)
             except Exception as e:
                 print(f"  Warning: Timeout waiting for matches ({e}), continuing anyway...", flush=True)
-                time.sleep(5)  # Fallback longer wait
 
             # Dismiss any popup dialogs (like "Welcome to Pro Tools for DNA!")
             try:
                 got_it_btn = page.query_selector('button:has-text("Got it")')
                 if got_it_btn:
                     got_it_btn.click()
+                    page.wait_for_selector('button:has-text("Got it")', state="hidden", timeout=5000)
                     print("Dismissed popup dialog", flush=True)
-                    time.sleep(1)
             except Exception:
                 pass  # No popup to dismiss
 
             # Save HTML for debugging selectors
-            html = page.content()
-            with open("/tmp/ancestry_matches.html", "w") as f:
-                f.write(html)
-            print("Saved HTML to /tmp/ancestry_matches.html", flush=True)
+            if debug:
+                html = page.content()
+                with open("/tmp/ancestry_matches.html", "w") as f:
+                    f.write(html)
+                print("Saved HTML to /tmp/ancestry_matches.html", flush=True)
+
+            # Only GUIDs (as guid_key ints) are kept in memory; match data is
+            # yielded page by page
+            seen_guids = set()
+
+            def take_new(scraped):
+                """
+                Record the GUIDs of scraped matches not seen before. Returns how
+                many there were, and those of them not in known_guids formatted
+                for import.
+                """
+                unseen = 0
+                new_matches = []
+                for m in scraped:
+                    key = guid_key(m['guid']) if m['guid'] else None
+                    if key is not None and key not in seen_guids:
+                        seen_guids.add(key)
+                        unseen += 1
+                        if key not in known_guids:
+                            new_matches.append(format_scraped_match(m))
+                return unseen, new_matches
+
+            def collected_all():
+                """True once every match the API reported (up to limit) has been seen."""
+                return bool(reported["total"]) and len(seen_guids) >= min(reported["total"], limit)
+
+            # Now that the browser session is established, page through the
+            # matches-list API with page.request (same cookies) instead of
+            # rendering every page of the UI
+            if test_guid:
+                print("Fetching matches via the in-browser API...", flush=True)
+                api_url = f"{ANCESTRY_BASE_URL}{ENDPOINTS['matches'].format(test_guid=test_guid)}"
+                api_total = 0
+                api_page = 1
+                while len(seen_guids) < limit:
+                    response = page.request.get(api_url, params={"page": api_page, "pagesize": 50,
+                                                                 "sortby": "RELATIONSHIP"})
+                    if not response.ok:
+                        print(f"  API page {api_page}: HTTP {response.status}", flush=True)
+                        break
+                    try:
+                        data = response.json()
+                    except Exception:
+                        print(f"  API page {api_page}: not JSON", flush=True)
+                        break
+                    api_total = data.get("totalMatches") or data.get("matchCount") or api_total
+                    reported["total"] = data.get("totalMatches") or reported["total"]
+
+                    unseen, new_matches = take_new(api_page_to_scraped(data))
+                    if not unseen:
+                        break
+                    if new_matches:
+                        yield new_matches
+
+                    if api_page % 20 == 0:
+                        print(f"  API page {api_page}: {len(seen_guids)} of {api_total} matches", flush=True)
+                    api_page += 1
+
+                if api_total and len(seen_guids) >= min(api_total, limit):
+                    print(f"\nTotal unique matches collected: {len(seen_guids)}")
+                    progress["done"] = True
+                    return
+                print(f"  API gave {len(seen_guids)} of {api_total} matches, scraping the match list UI", flush=True)
 
             # Set 50 matches per page (reduces pages from 1318 to ~527)
             print("Setting 50 matches per page...", flush=True)
             try:
-                result = page.evaluate('''
-                    () => {
-                        const p = document.querySelector('ui-pagination[data-testid="paginator"]');
-                        if (!p || !p.shadowRoot) return 'no shadow';
-                        const sel = p.shadowRoot.querySelector('#item-select');
-                        if (!sel) return 'no select';
-                        sel.value = '50';
-                        sel.dispatchEvent(new Event('change', {bubbles: true}));
-                        return 'done';
-                    }
-                ''')
-                time.sleep(3)  # Wait for page to reload with more items
+                with page.expect_response(is_matches_list, timeout=10000):
+                    result = page.evaluate('''
+                        () => {
+                            const p = document.querySelector('ui-pagination[data-testid="paginator"]');
+                            if (!p || !p.shadowRoot) return 'no shadow';
+                            const sel = p.shadowRoot.querySelector('#item-select');
+                            if (!sel) return 'no select';
+                            sel.value = '50';
+                            sel.dispatchEvent(new Event('change', {bubbles: true}));
+                            return 'done';
+                        }
+                    ''')
                 print(f"  Set to 50 per page ({result})", flush=True)
             except Exception as e:
                 print(f"  Could not set page size (using 20): {e}", flush=True)
 
-            # Use PAGINATION to load all matches (not scrolling)
-            # The page has a <ui-pagination data-testid="paginator"> element
-            # that shows total count and allows clicking through pages
-            all_matches_data = []
-            seen_guids = set()
-
-            # Get pagination info first
+            # The page may have a <ui-pagination data-testid="paginator"> element
+            # that shows the page count; report it as an estimate
             pagination_info = page.evaluate("""
                 () => {
                     const paginator = document.querySelector('ui-pagination[data-testid="paginator"]');
@@ -209,330 +587,225 @@ def fetch_matches_with_browser(test_guid=None, headless=False, limit=10000):
                 print(f"\nFound pagination: {total_pages} pages, {items_per_page}/page")
                 print(f"Estimated total matches: ~{estimated_matches:,}")
             else:
-                print("\nNo pagination found, will use infinite scroll to load matches")
-                total_pages = 0  # Flag to use scroll mode instead of page mode
-
-            # Function to extract matches from current page
-            def extract_current_page_matches():
-                return page.evaluate("""
-                    () => {
-                        const matches = [];
-                        // Updated selector for current Ancestry page structure
-                        const entries = document.querySelectorAll('.matchEntry');
-                        entries.forEach((entry) => {
-                            try {
-                                // Find name link - 2026 UI: matchInfoName link carries aria-label and visible text
-                                const nameLink = entry.querySelector('a.matchInfoName[aria-label]');
-                                let matchGuid = null;
-                                let name = null;
-                                if (nameLink) {
-                                    name = nameLink.textContent.trim();
-                                    const guidMatch = nameLink.href.match(/with\\/([A-F0-9-]+)/i);
-                                    if (guidMatch) {
-                                        matchGuid = guidMatch[1].toUpperCase();
-                                    }
-                                }
-                                if (matchGuid) {
-                                    // Find cM - look for sharedDNA testid or text containing cM
-                                    let sharedCm = null;
-                                    const cmEl = entry.querySelector('[data-testid="sharedDNA"]');
-                                    const cmText = cmEl ? cmEl.textContent : entry.textContent;
-                                    const cmMatch = cmText.match(/([\\d,]+)\\s*cM/i);
-                                    if (cmMatch) {
-                                        sharedCm = parseFloat(cmMatch[1].replace(/,/g, ''));
-                                    }
-
-                                    // Relationship
-                                    const relEl = entry.querySelector('.relationshipLabel');
-                                    const relationship = relEl ? relEl.textContent.trim() : null;
-
-                                    // Side info
-                                    const sideEl = entry.querySelector('.familySideInfo');
-                                    const matchSide = sideEl ? sideEl.textContent.trim() : null;
-
-                                    // Tree info - look for tree link in matchTreeInfo
-                                    let hasTree = false;
-                                    let treeSize = null;
-                                    let linkedTreeId = null;
-                                    const treeInfo = entry.querySelector('.matchTreeInfo');
-                                    if (treeInfo) {
-                                        const treeLink = treeInfo.querySelector('a[href*="family-tree"]');
-                                        if (treeLink) {
-                                            hasTree = true;
-                                            const sizeMatch = treeLink.textContent.match(/(\\d[\\d,]*)\\s*pe/i);
-                                            if (sizeMatch) treeSize = parseInt(sizeMatch[1].replace(/,/g, ''));
-                                            const treeIdMatch = treeLink.href.match(/tree\\/(\\d+)/);
-                                            if (treeIdMatch) linkedTreeId = treeIdMatch[1];
-                                        } else if (treeInfo.textContent.includes('Unlinked tree') || treeInfo.textContent.includes('Public linked tree')) {
-                                            hasTree = true;
-                                            const sizeMatch = treeInfo.textContent.match(/(\\d[\\d,]*)\\s*pe/i);
-                                            if (sizeMatch) treeSize = parseInt(sizeMatch[1].replace(/,/g, ''));
-                                        }
-                                    }
-
-                                    matches.push({
-                                        guid: matchGuid,
-                                        name: name,
-                                        sharedCm: sharedCm,
-                                        relationship: relationship,
-                                        matchSide: matchSide,
-                                        hasTree: hasTree,
-                                        treeSize: treeSize,
-                                        linkedTreeId: linkedTreeId
-                                    });
-                                }
-                            } catch (e) {}
-                        });
-                        return matches;
-                    }
-                """)
+                print("\nNo pagination found, will load pages until they run out")
 
-            # URL-BASED PAGINATION: Navigate through pages using URL parameter
-            # Ancestry's new UI doesn't show pagination UI but supports ?currentPage=N
-            if total_pages == 0:
-                print("\nUsing URL-based pagination (Ancestry 2026 UI)...")
-                base_url = f"{ANCESTRY_BASE_URL}/discoveryui-matches/list/{test_guid}?sharedDna=allMatches"
+            # Ancestry's new UI doesn't always show the paginator, but both
+            # layouts support ?currentPage=N. The pages are loaded by URL once
+            # this browser has been closed (see below).
+            list_pages = True
 
-                current_page = 1
-                consecutive_empty = 0
-                max_empty = 10  # Stop after 10 pages with no new matches (allow for occasional extraction failures)
+        except Exception as e:
+            # Pages yielded before the error have already been handed to the caller
+            print(f"\nError during browser automation: {e}", flush=True)
+            traceback.print_exc()
+
+        finally:
+            print("\nClosing browser...", flush=True)
+            save_storage_state(context)
+            context.close()
+            browser.close()
 
+    if not list_pages:
+        return
+
+    # URL-BASED PAGINATION: load the list pages several at a time, across the worker pages of one
+    # async browser context. It runs its own Playwright, so it's only started
+    # once the sync one above has stopped.
+    print("\nLoading match list pages by URL...")
+    if start_page > 1:
+        print(f"  Resuming from page {start_page}", flush=True)
+    consecutive_empty = 0
+    max_empty = 10  # Stop after 10 pages with no new matches (allow for occasional extraction failures)
+    last_page = 0
+    # Pages read so far beyond the contiguous run reported in progress["page"]
+    read_ahead = set()
+    # Pages that failed every attempt; progress["page"] can't pass the first
+    failed_pages = set()
+    out_of_pages = False
+    try:
+        with ancestry_browser(headless) as (loop, async_context):
+            # Safety limit - about 1320 pages for ~26k matches at 20/page
+            pages = _scan_pages(async_context, range(start_page, 1501), test_guid, _scrape_list_page)
+            try:
                 while consecutive_empty < max_empty:
-                    # Navigate to page with retry logic
-                    page_url = f"{base_url}&currentPage={current_page}"
-                    page_loaded = False
-                    for attempt in range(3):
-                        try:
-                            page.goto(page_url, wait_until="domcontentloaded", timeout=45000)
-                            time.sleep(3)  # Longer delay to avoid rate limiting
-                            page_loaded = True
-                            break
-                        except Exception as e:
-                            if attempt < 2:
-                                print(f"  Page {current_page}: retry {attempt+1} after error", flush=True)
-                                time.sleep(5)
-                            else:
-                                print(f"  Page {current_page}: failed after 3 attempts, skipping", flush=True)
-
-                    if not page_loaded:
-                        current_page += 1
-                        continue  # Skip extraction, move to next page
-
-                    # Extract matches from this page
-                    current_matches = extract_current_page_matches()
-
-                    # Count new matches
-                    new_count = 0
-                    for m in current_matches:
-                        if m['guid'] and m['guid'] not in seen_guids:
-                            seen_guids.add(m['guid'])
-                            all_matches_data.append(m)
-                            new_count += 1
+                    try:
+                        _, current_page, current_matches = loop.run_until_complete(pages.__anext__())
+                    except StopAsyncIteration:
+                        print(f"  Safety limit reached at page {last_page}", flush=True)
+                        out_of_pages = True
+                        break
+                    last_page = max(last_page, current_page)
+                    if isinstance(current_matches, Exception):
+                        print(f"  Page {current_page}: failed after 3 attempts, skipping", flush=True)
+                        failed_pages.add(current_page)
+                        continue
+
+                    # Pages finish in no particular order; seen_guids dedupes across them
+                    unseen, new_matches = take_new(current_matches)
+                    read_ahead.add(current_page)
+                    while progress["page"] + 1 in read_ahead:
+                        progress["page"] += 1
+                        read_ahead.remove(progress["page"])
+                    if new_matches:
+                        yield new_matches
 
                     if current_page % 20 == 0 or current_page <= 5:
-                        print(f"  Page {current_page}: {len(all_matches_data)} total (+{new_count} new)", flush=True)
+                        print(f"  Page {current_page}: {len(seen_guids)} total (+{len(new_matches)} new)", flush=True)
 
-                    if new_count == 0:
+                    # Already-imported matches still count as progress here
+                    if unseen == 0:
                         consecutive_empty += 1
                     else:
                         consecutive_empty = 0
 
-                    current_page += 1
-
-                    if len(all_matches_data) >= limit:
+                    if len(seen_guids) >= limit:
                         print(f"  Reached limit of {limit} matches", flush=True)
                         break
 
-                    # Safety limit - about 1320 pages for ~26k matches at 20/page
-                    if current_page > 1500:
-                        print(f"  Safety limit reached at page {current_page}", flush=True)
+                    if collected_all():
+                        print(f"  Collected all {reported['total']} reported matches", flush=True)
                         break
+                # Only a finished list clears the caller's checkpoint: every
+                # reported match seen, or the end of the list reached with no
+                # failed pages behind it. After a --limit stop or a skipped
+                # page, the next run resumes from progress["page"].
+                reached_end = consecutive_empty >= max_empty or out_of_pages
+                progress["done"] = (bool(reported["total"]) and len(seen_guids) >= reported["total"]
+                                    or reached_end and not failed_pages and len(seen_guids) < limit)
+                if failed_pages:
+                    print(f"  {len(failed_pages)} pages failed (first: {min(failed_pages)}); "
+                          f"progress stops at page {progress['page']}", flush=True)
+            finally:
+                loop.run_until_complete(pages.aclose())
+    except Exception as e:
+        # Pages yielded before the error have already been handed to the caller
+        print(f"\nError during browser automation: {e}", flush=True)
+        traceback.print_exc()
 
-                print(f"\nURL pagination complete: {len(all_matches_data)} matches from {current_page-1} pages")
+    print(f"\nURL pagination complete: {len(seen_guids)} matches from {last_page} pages")
 
-            else:
-                # PAGINATION MODE: Use page numbers when pagination element exists
-                print(f"\nPaginating through all {total_pages} pages (this may take a while)...")
-                print(f"  Estimated time: ~{total_pages * 1.5 / 60:.0f} minutes at 1.5s per page")
-
-            current_page = 1
-            consecutive_failures = 0
-            max_failures = 20  # Allow more failures for 500+ pages
-            last_first_guid = None  # Track content changes
-
-            # Helper to get first match GUID on page
-            def get_first_guid():
-                return page.evaluate('''
-                    () => {
-                        const link = document.querySelector('a[data-testid="matchNameLink"]');
-                        if (!link || !link.href) return null;
-                        const m = link.href.match(/with\\/([A-F0-9-]+)/i);
-                        return m ? m[1].toUpperCase() : null;
-                    }
-                ''')
-
-            while total_pages > 0 and current_page <= total_pages and consecutive_failures < max_failures:
-                # Extract matches from current page
-                current_matches = extract_current_page_matches()
-
-                # Count new matches
-                new_count = 0
-                for m in current_matches:
-                    if m['guid'] and m['guid'] not in seen_guids:
-                        seen_guids.add(m['guid'])
-                        all_matches_data.append(m)
-                        new_count += 1
 
-                if current_page % 20 == 0 or current_page <= 5 or current_page == total_pages:
-                    pct = (current_page / total_pages) * 100
-                    print(f"  Page {current_page}/{total_pages} ({pct:.1f}%): +{new_count} new, {len(all_matches_data)} total", flush=True)
-
-                # INCREMENTAL SAVE: Save every 50 pages to avoid losing progress
-                if current_page % 50 == 0 and len(all_matches_data) > 0:
-                    print(f"  ** Saving {len(all_matches_data)} matches to database...", flush=True)
-                    temp_matches = []
-                    for m in all_matches_data:
-                        side_text = m.get('matchSide', '') or ''
-                        side = 'unknown'
-                        if 'Paternal' in side_text: side = 'paternal'
-                        elif 'Maternal' in side_text: side = 'maternal'
-                        elif 'Both sides' in side_text: side = 'both'
-                        temp_matches.append({
-                            'name': m.get('name'),
-                            'shared_cm': m.get('sharedCm'),
-                            'predicted_relationship': m.get('relationship'),
-                            'match_side': side,
-                            'ancestry_id': m.get('guid'),
-                        })
-                    import_browser_matches(temp_matches, DB_PATH)
-                    print(f"  ** Save complete", flush=True)
-
-                # Only count as failure if page returned NO matches at all (not just no NEW matches)
-                if len(current_matches) == 0:
-                    consecutive_failures += 1
-                else:
-                    consecutive_failures = 0
-
-                # Track consecutive pages with no NEW matches (pagination may be stuck)
-                if not hasattr(fetch_matches_with_browser, 'no_new_count'):
-                    fetch_matches_with_browser.no_new_count = 0
-                if new_count == 0 and len(current_matches) > 0:
-                    fetch_matches_with_browser.no_new_count += 1
-                else:
-                    fetch_matches_with_browser.no_new_count = 0
-
-                # If 30+ consecutive pages have no new matches, pagination is broken - stop early
-                if fetch_matches_with_browser.no_new_count >= 30:
-                    print(f"\n  ** Pagination appears stuck (30 pages with no new matches). Stopping early.", flush=True)
-                    break
-
-                # Move to next page using shadow DOM page-select dropdown
-                if current_page < total_pages:
-                    next_page = current_page + 1
-                    current_first_guid = get_first_guid()
-
-                    # Navigate with retry logic
-                    for retry in range(3):
-                        try:
-                            page.evaluate(f"""
-                                (targetPage) => {{
-                                    const p = document.querySelector('ui-pagination[data-testid="paginator"]');
-                                    if (p && p.shadowRoot) {{
-                                        const sel = p.shadowRoot.querySelector('#page-select');
-                                        if (sel) {{
-                                            sel.value = String(targetPage);
-                                            sel.dispatchEvent(new Event('change', {{bubbles: true}}));
-                                        }}
-                                    }}
-                                }}
-                            """, next_page)
-
-                            # Wait for content to change
-                            content_changed = False
-                            for _ in range(10):  # Up to 5 seconds
-                                time.sleep(0.5)
-                                new_first_guid = get_first_guid()
-                                if new_first_guid and new_first_guid != current_first_guid:
-                                    content_changed = True
-                                    break
-
-                            if content_changed:
-                                break
-                            elif retry < 2:
-                                print(f"    Retry {retry+1} for page {next_page}...", flush=True)
-                                time.sleep(1)  # Extra wait before retry
-                            else:
-                                print(f"    Page {next_page}: content change not detected, continuing anyway", flush=True)
-
-                        except Exception as e:
-                            if retry == 2:
-                                print(f"  Failed to navigate to page {next_page}: {e}", flush=True)
-                                consecutive_failures += 1
-
-                current_page += 1
-
-            print(f"\nTotal unique matches collected: {len(all_matches_data)}")
-
-            # Convert collected data to expected format
-            matches = []
-            for m in all_matches_data:
-                # Parse match_side
-                side_text = m.get('matchSide', '') or ''
-                side = 'unknown'
-                if 'Paternal' in side_text:
-                    side = 'paternal'
-                elif 'Maternal' in side_text:
-                    side = 'maternal'
-                elif 'Both sides' in side_text:
-                    side = 'both'
-                elif 'Parent 1' in side_text:
-                    side = 'parent1'
-                elif 'Parent 2' in side_text:
-                    side = 'parent2'
-
-                matches.append({
-                    'name': m.get('name'),
-                    'shared_cm': m.get('sharedCm'),
-                    'predicted_relationship': m.get('relationship'),
-                    'ancestry_id': m.get('guid'),
-                    'match_side': side,
-                    'tree_size': m.get('treeSize'),
-                    'has_tree': m.get('hasTree', False),
-                    'linked_tree_id': m.get('linkedTreeId')
-                })
+async def _fetch_match_pages(cookies, test_guid, limit, page_size, workers, pages):
+    """
+    Fetch matches-list API pages with an httpx.AsyncClient. Page 1 gives the
+    total; the remaining pages are pulled off a queue by concurrent workers.
+    Each page's JSON is put on the pages queue as it arrives (in no particular
+    order). Returns the total number of matches the API reports.
+    """
+    import httpx
+
+    url = f"{ANCESTRY_BASE_URL}{ENDPOINTS['matches'].format(test_guid=test_guid)}"
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
+        "Accept": "application/json",
+    }
+    try:
+        import h2  # noqa: F401 - httpx only speaks HTTP/2 with it installed
+        use_http2 = True
+    except ImportError:
+        use_http2 = False
+
+    async with httpx.AsyncClient(cookies=cookies, headers=headers, http2=use_http2, timeout=30,
+                                 limits=httpx.Limits(max_connections=workers)) as client:
+        async def get_page(page_num):
+            response = await client.get(url, params={"page": page_num, "pagesize": page_size,
+                                                     "sortby": "RELATIONSHIP"})
+            response.raise_for_status()
+            return response.json()  # raises ValueError on a CAPTCHA/HTML page
+
+        first = await get_page(1)
+        total = first.get("totalMatches") or first.get("matchCount") or 0
+        await pages.put(first)
+
+        page_numbers = asyncio.Queue()
+        for page_num in range(2, math.ceil(min(total, limit) / page_size) + 1):
+            page_numbers.put_nowait(page_num)
+
+        async def worker():
+            while not page_numbers.empty():
+                page_num = page_numbers.get_nowait()
+                await pages.put(await get_page(page_num))
+
+        await asyncio.gather(*(worker() for _ in range(workers)))
+
+    return total
 
-            print(f"Formatted {len(matches)} matches for import", flush=True)
 
+def fetch_matches_with_api(test_guid, limit=10000, page_size=50, workers=8, db_path=DB_PATH):
+    """
+    Fetch DNA matches straight from the matches-list JSON API using the Chrome
+    cookie jar, with concurrent page requests instead of a browser. Pages are
+    handed through a small queue to import_browser_matches running in a
+    worker thread, so database writes overlap with the remaining fetches.
+
+    Returns the number of matches fetched, or None if the API refuses the
+    request (403 / CAPTCHA) or returns fewer matches than it reports, in which
+    case the caller should fall back to the browser. Anything fetched before
+    that point has already been imported.
+    """
+    try:
+        import httpx
+    except ImportError:
+        print("httpx not installed, using browser")
+        return None
+
+    print("\n" + "=" * 60)
+    print("API MODE (httpx)")
+    print("=" * 60)
+
+    cookies = http.cookiejar.CookieJar()
+    for domain in [".ancestry.co.uk", ".ancestry.com"]:
+        try:
+            for cookie in _get_cookies_cached(domain):
+                cookies.set_cookie(cookie)
         except Exception as e:
-            print(f"\nError during browser automation: {e}", flush=True)
-            import traceback
-            traceback.print_exc()
-            # Save any matches collected before the error
-            if 'all_matches_data' in dir() and all_matches_data:
-                print(f"\nSaving {len(all_matches_data)} matches collected before error...", flush=True)
-                for m in all_matches_data:
-                    side_text = m.get('matchSide', '') or ''
-                    side = 'unknown'
-                    if 'Paternal' in side_text: side = 'paternal'
-                    elif 'Maternal' in side_text: side = 'maternal'
-                    elif 'Both sides' in side_text: side = 'both'
-                    matches.append({
-                        'name': m.get('name'),
-                        'shared_cm': m.get('sharedCm'),
-                        'predicted_relationship': m.get('relationship'),
-                        'ancestry_id': m.get('guid'),
-                        'match_side': side,
-                        'tree_size': m.get('treeSize'),
-                        'has_tree': m.get('hasTree', False),
-                        'linked_tree_id': m.get('linkedTreeId')
-                    })
+            print(f"  Warning: {domain}: {e}")
+
+    seen_guids = set()
+
+    async def fetch_and_import():
+        loop = asyncio.get_running_loop()
+        # Small bound so fetching can only run a few pages ahead of the writer
+        pages = asyncio.Queue(maxsize=4)
+
+        def new_matches():
+            # Runs in the writer thread, taking pages off the event loop's queue
+            while (data := asyncio.run_coroutine_threadsafe(pages.get(), loop).result()) is not None:
+                for m in api_page_to_scraped(data):
+                    if not m['guid'] or len(seen_guids) >= limit:
+                        continue
+                    key = guid_key(m['guid'])
+                    if key not in seen_guids:
+                        seen_guids.add(key)
+                        yield format_scraped_match(m)
+
+        writer = asyncio.create_task(asyncio.to_thread(import_browser_matches, new_matches(), db_path))
+        fetch = asyncio.create_task(_fetch_match_pages(cookies, test_guid, limit, page_size, workers, pages))
+
+        # The writer only finishes before the fetch if it failed
+        await asyncio.wait({writer, fetch}, return_when=asyncio.FIRST_COMPLETED)
+        if writer.done():
+            fetch.cancel()
+            writer.result()
 
+        try:
+            return await fetch
         finally:
-            print("\nClosing browser...", flush=True)
-            context.close()
-            browser.close()
+            await pages.put(None)
+            await writer
+
+    try:
+        total = asyncio.run(fetch_and_import())
+    except (httpx.HTTPError, ValueError) as e:
+        print(f"  API request failed ({e}), falling back to browser", flush=True)
+        return None
+
+    print(f"  Fetched {len(seen_guids)} of {total} matches", flush=True)
+    if not total or len(seen_guids) < min(total, limit):
+        print("  API returned fewer matches than reported, falling back to browser", flush=True)
+        return None
 
-    return matches
+    return len(seen_guids)
 
 
 ANCESTRY_DNA_API = "https://www.ancestry.co.uk/discoveryui-matchesservice/api"
@@ -546,56 +819,83 @@ ENDPOINTS = {
 }
 
 
-def get_browser_cookies():
-    """Extract Ancestry cookies from browser."""
-    print("Extracting cookies from browser...")
+def _get_cookies_cached(domain, browser="chrome"):
+    """
+    Read a browser's cookies for one domain, once per run. Each browser_cookie3
+    call reopens the Cookies database and decrypts it, so repeat lookups reuse
+    this result. Returned as a tuple so callers can't mutate the cached copy.
+    """
+    # lru_cache keys on how arguments were passed, so f(d) and f(d, "chrome")
+    # would be cached separately; always hit the cache with both positionally
+    return _read_cookies(domain, browser)
 
-    cookies = None
 
-    # Try Chrome first (check both .co.uk and .com domains)
-    try:
-        cookies = browser_cookie3.chrome(domain_name=".ancestry.co.uk")
-        print("  Found Chrome cookies (.co.uk)")
-        return cookies
-    except Exception as e:
-        print(f"  Chrome (.co.uk): {e}")
+@functools.lru_cache(maxsize=None)
+def _read_cookies(domain, browser):
+    return tuple(getattr(browser_cookie3, browser)(domain_name=domain))
 
-    try:
-        cookies = browser_cookie3.chrome(domain_name=".ancestry.com")
-        print("  Found Chrome cookies (.com)")
-        return cookies
-    except Exception as e:
-        print(f"  Chrome (.com): {e}")
 
-    # Try Firefox
-    try:
-        cookies = browser_cookie3.firefox(domain_name=".ancestry.co.uk")
-        print("  Found Firefox cookies (.co.uk)")
-        return cookies
-    except Exception as e:
-        print(f"  Firefox (.co.uk): {e}")
+def _cookie_jar(cookies):
+    """Build a fresh RequestsCookieJar from cached cookies."""
+    jar = requests.cookies.RequestsCookieJar()
+    for cookie in cookies:
+        jar.set_cookie(cookie)
+    return jar
 
-    try:
-        cookies = browser_cookie3.firefox(domain_name=".ancestry.com")
-        print("  Found Firefox cookies (.com)")
-        return cookies
-    except Exception as e:
-        print(f"  Firefox (.com): {e}")
 
-    # Try Safari
-    try:
-        cookies = browser_cookie3.safari(domain_name=".ancestry.co.uk")
-        print("  Found Safari cookies (.co.uk)")
-        return cookies
-    except Exception as e:
-        print(f"  Safari (.co.uk): {e}")
+@functools.lru_cache(maxsize=1)
+def _playwright_cookies():
+    """
+    Chrome's Ancestry cookies (.co.uk and .com) in the dict form Playwright's
+    add_cookies() expects. Built once per run and shared by every browser
+    entry point; callers get their own list copy.
+    """
+    cookie_list = []
+    for domain in [".ancestry.co.uk", ".ancestry.com"]:
+        try:
+            for cookie in _get_cookies_cached(domain):
+                cookie_list.append({
+                    "name": cookie.name,
+                    "value": cookie.value,
+                    "domain": cookie.domain,
+                    "path": cookie.path,
+                    "secure": bool(cookie.secure),
+                })
+        except Exception as e:
+            print(f"  Warning: {domain}: {e}")
+    return tuple(cookie_list)
+
+
+def get_browser_cookies():
+    """Extract Ancestry cookies from browser."""
+    print("Extracting cookies from browser...")
+
+    # In order of preference: Chrome first, and .co.uk before .com
+    probes = [
+        ("Chrome", "chrome", ".ancestry.co.uk"),
+        ("Chrome", "chrome", ".ancestry.com"),
+        ("Firefox", "firefox", ".ancestry.co.uk"),
+        ("Firefox", "firefox", ".ancestry.com"),
+        ("Safari", "safari", ".ancestry.co.uk"),
+        ("Safari", "safari", ".ancestry.com"),
+    ]
 
+    # Each probe opens a cookie database (and possibly the OS keyring), so run
+    # them all at once and take the most preferred one that succeeds
+    executor = ThreadPoolExecutor(max_workers=len(probes))
+    futures = [executor.submit(_get_cookies_cached, domain, browser) for _, browser, domain in probes]
     try:
-        cookies = browser_cookie3.safari(domain_name=".ancestry.com")
-        print("  Found Safari cookies (.com)")
-        return cookies
-    except Exception as e:
-        print(f"  Safari (.com): {e}")
+        for (label, _, domain), future in zip(probes, futures):
+            suffix = domain.removeprefix(".ancestry")
+            try:
+                cookies = _cookie_jar(future.result())
+            except Exception as e:
+                print(f"  {label} ({suffix}): {e}")
+                continue
+            print(f"  Found {label} cookies ({suffix})")
+            return cookies
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
 
     return None
 
@@ -623,10 +923,61 @@ def create_session():
     return session
 
 
+def _find_test_guid(data):
+    """Find the first test GUID in a /dna/secure/tests JSON response."""
+    if isinstance(data, dict):
+        for key in ("testGuid", "guid", "sampleId"):
+            if isinstance(data.get(key), str):
+                return data[key]
+        values = data.values()
+    elif isinstance(data, list):
+        values = data
+    else:
+        return None
+
+    for value in values:
+        guid = _find_test_guid(value)
+        if guid:
+            return guid
+    return None
+
+
+def _cookie_hash(session):
+    """Stable hash of the session's cookies, used to key the cached test GUID."""
+    pairs = sorted(f"{c.domain}:{c.name}={c.value}" for c in session.cookies)
+    return hashlib.sha256("\n".join(pairs).encode()).hexdigest()
+
+
 def get_test_guid(session):
-    """Get the DNA test GUID for the logged-in user by following redirects."""
+    """
+    Get the DNA test GUID for the logged-in user.
+    Tries the cached GUID for these cookies, then the /dna/secure/tests JSON
+    API, and only then follows the /dna page redirects.
+    """
     print("\nFetching your DNA test info...")
 
+    cookie_hash = _cookie_hash(session)
+    try:
+        cached_hash, cached_guid = GUID_CACHE_PATH.read_text().split()
+        if cached_hash == cookie_hash:
+            print(f"  Using cached test GUID: {cached_guid}")
+            return cached_guid
+    except (OSError, ValueError):
+        pass
+
+    try:
+        response = session.get(f"{ANCESTRY_BASE_URL}{ENDPOINTS['tests']}", timeout=30)
+        if response.status_code == 200:
+            guid = _find_test_guid(response.json())
+            if guid:
+                guid = guid.upper()
+                print(f"  Found test GUID: {guid}")
+                GUID_CACHE_PATH.write_text(f"{cookie_hash} {guid}\n")
+                return guid
+        print(f"  Tests API returned {response.status_code}, trying /dna redirect")
+    except Exception as e:
+        print(f"  Tests API error: {e}")
+
     # The DNA page redirects to a URL containing the test GUID
     url = f"{ANCESTRY_BASE_URL}/dna"
 
@@ -635,12 +986,12 @@ def get_test_guid(session):
         final_url = response.url
 
         # Extract GUID from URL like: /dna/insights/E756DE6C-0C8D-443B-8793-ADDB6F35FD6A
-        import re
-        guid_match = re.search(r'/([A-F0-9]{8}-[A-F0-9]{4}-[A-F0-9]{4}-[A-F0-9]{4}-[A-F0-9]{12})', final_url, re.IGNORECASE)
+        guid_match = GUID_RE.search(final_url)
 
         if guid_match:
             guid = guid_match.group(1).upper()
             print(f"  Found test GUID: {guid}")
+            GUID_CACHE_PATH.write_text(f"{cookie_hash} {guid}\n")
             return guid
         else:
             print(f"  Could not find GUID in URL: {final_url}")
@@ -681,6 +1032,20 @@ def fetch_matches(session, test_guid, page=1, page_size=50, min_cm=None, max_cm=
         return None
 
 
+async def _send_probes(session, probes):
+    """
+    Send (method, url, kwargs) requests concurrently with the session's cookies
+    and headers. Returns responses (or the exception raised) in probe order.
+    """
+    import httpx
+
+    async with httpx.AsyncClient(cookies=session.cookies, headers=dict(session.headers), timeout=30) as client:
+        return await asyncio.gather(
+            *(client.request(method, url, **kwargs) for method, url, kwargs in probes),
+            return_exceptions=True,
+        )
+
+
 def explore_api_response(session, test_guid):
     """Explore the API response to find pagination mechanisms."""
     print("\n" + "=" * 60)
@@ -743,108 +1108,136 @@ def explore_api_response(session, test_guid):
 
     # Test 1: bucketId parameter (Ancestry often uses relationship "buckets")
     buckets = [1, 2, 3, 4, 5, 6, 7]  # Different relationship categories
-    print("\nTesting bucketId parameter:")
-    for bucket in buckets:
-        resp = session.get(url, params={"bucketid": bucket})
-        if resp.status_code == 200:
-            d = resp.json()
-            count = d.get("matchCount", 0)
-            total = d.get("totalMatches", 0)
-            groups = len(d.get("matchGroups", []))
-            if count > 0:
-                print(f"  bucketid={bucket}: {count} matches (total: {total}, groups: {groups})")
 
     # Test 2: cM ranges
-    print("\nTesting cM range filtering:")
     cm_ranges = [(400, None), (200, 400), (100, 200), (50, 100), (20, 50), (8, 20)]
+    cm_params = []
     for min_cm, max_cm in cm_ranges:
         params = {"sortby": "RELATIONSHIP"}
         if min_cm:
             params["mincm"] = min_cm
         if max_cm:
             params["maxcm"] = max_cm
-        resp = session.get(url, params=params)
-        if resp.status_code == 200:
-            d = resp.json()
-            count = d.get("matchCount", 0)
-            total = d.get("totalMatches", 0)
-            range_str = f"{min_cm}+" if max_cm is None else f"{min_cm}-{max_cm}"
-            if count > 0 or total > 0:
-                print(f"  cM {range_str}: returned {count}, total {total}")
+        cm_params.append(params)
 
     # Test 3: Check for a "v2" or alternate endpoint
-    print("\nTesting alternate endpoints:")
     alt_endpoints = [
         f"/discoveryui-matchesservice/api/samples/{test_guid}/matches",
         f"/discoveryui-matchesservice/api/samples/{test_guid}/matchlist",
         f"/dna/secure/tests/{test_guid}/matches",
         f"/api/dna/matches/{test_guid}",
     ]
-    for endpoint in alt_endpoints:
-        try:
-            resp = session.get(f"https://www.ancestry.co.uk{endpoint}")
-            print(f"  {endpoint}: {resp.status_code}")
-            if resp.status_code == 200:
-                try:
-                    d = resp.json()
-                    print(f"    Keys: {list(d.keys())[:5]}")
-                except:
-                    print(f"    (not JSON)")
-        except Exception as e:
-            print(f"  {endpoint}: error - {e}")
 
     # Test 4: Different pagination parameters (GET)
-    print("\nTesting pagination parameters (GET):")
     test_params = [
         {"page": 2},
         {"pageIdx": 2},
         {"offset": 200},
         {"lastMatchesServicePageIdx": 2},
     ]
-    for params in test_params:
-        resp = session.get(url, params=params)
-        if resp.status_code == 200:
-            d = resp.json()
-            count = d.get("matchCount", 0)
-            bookmark = d.get("bookmarkData", {})
-            page_idx = bookmark.get("lastMatchesServicePageIdx")
-            print(f"  {params}: count={count}, pageIdx={page_idx}")
 
     # Test 5: Try POST with bookmark data
-    print("\nTesting POST requests:")
     post_payloads = [
         {"bookmarkData": {"lastMatchesServicePageIdx": 2}},
         {"page": 2},
         {"pageIdx": 2},
         {"lastMatchesServicePageIdx": 2},
     ]
-    for payload in post_payloads:
-        try:
-            resp = session.post(url, json=payload)
-            print(f"  POST {payload}: status={resp.status_code}")
-            if resp.status_code == 200:
-                d = resp.json()
-                count = d.get("matchCount", 0)
-                print(f"    count={count}")
-        except Exception as e:
-            print(f"  POST {payload}: error - {e}")
 
     # Test 6: Check for paged vs list endpoint variations
-    print("\nTesting endpoint variations:")
     endpoint_vars = [
         f"/discoveryui-matchesservice/api/samples/{test_guid}/matches/list?page=2",
         f"/discoveryui-matchesservice/api/samples/{test_guid}/matches/paged?page=2",
         f"/discoveryui-matchesservice/api/samples/{test_guid}/matchespaged",
         f"/discoveryui-matchesservice/api/samples/{test_guid}/matches/all",
     ]
-    for endpoint in endpoint_vars:
-        try:
-            resp = session.get(f"https://www.ancestry.co.uk{endpoint}")
-            print(f"  {endpoint.split('/')[-1]}: {resp.status_code}")
-        except Exception as e:
-            print(f"  error: {e}")
-
-    return data
+
+    # Send every probe at once, then report each test's results in order
+    probes = (
+        [("GET", url, {"params": {"bucketid": bucket}}) for bucket in buckets]
+        + [("GET", url, {"params": params}) for params in cm_params]
+        + [("GET", f"https://www.ancestry.co.uk{endpoint}", {}) for endpoint in alt_endpoints]
+        + [("GET", url, {"params": params}) for params in test_params]
+        + [("POST", url, {"json": payload}) for payload in post_payloads]
+        + [("GET", f"https://www.ancestry.co.uk{endpoint}", {}) for endpoint in endpoint_vars]
+    )
+    try:
+        responses = iter(asyncio.run(_send_probes(session, probes)))
+    except ImportError:
+        print("  httpx not installed, skipping parameter probes")
+        return data
+
+    def json_or_none(resp):
+        if isinstance(resp, Exception) or resp.status_code != 200:
+            return None
+        try:
+            return resp.json()
+        except ValueError:
+            return None
+
+    print("\nTesting bucketId parameter:")
+    for bucket in buckets:
+        d = json_or_none(next(responses))
+        if d is not None:
+            count = d.get("matchCount", 0)
+            total = d.get("totalMatches", 0)
+            groups = len(d.get("matchGroups", []))
+            if count > 0:
+                print(f"  bucketid={bucket}: {count} matches (total: {total}, groups: {groups})")
+
+    print("\nTesting cM range filtering:")
+    for min_cm, max_cm in cm_ranges:
+        d = json_or_none(next(responses))
+        if d is not None:
+            count = d.get("matchCount", 0)
+            total = d.get("totalMatches", 0)
+            range_str = f"{min_cm}+" if max_cm is None else f"{min_cm}-{max_cm}"
+            if count > 0 or total > 0:
+                print(f"  cM {range_str}: returned {count}, total {total}")
+
+    print("\nTesting alternate endpoints:")
+    for endpoint in alt_endpoints:
+        resp = next(responses)
+        if isinstance(resp, Exception):
+            print(f"  {endpoint}: error - {resp}")
+            continue
+        print(f"  {endpoint}: {resp.status_code}")
+        if resp.status_code == 200:
+            d = json_or_none(resp)
+            if d is not None:
+                print(f"    Keys: {list(d.keys())[:5]}")
+            else:
+                print(f"    (not JSON)")
+
+    print("\nTesting pagination parameters (GET):")
+    for params in test_params:
+        d = json_or_none(next(responses))
+        if d is not None:
+            count = d.get("matchCount", 0)
+            bookmark = d.get("bookmarkData", {})
+            page_idx = bookmark.get("lastMatchesServicePageIdx")
+            print(f"  {params}: count={count}, pageIdx={page_idx}")
+
+    print("\nTesting POST requests:")
+    for payload in post_payloads:
+        resp = next(responses)
+        if isinstance(resp, Exception):
+            print(f"  POST {payload}: error - {resp}")
+            continue
+        print(f"  POST {payload}: status={resp.status_code}")
+        d = json_or_none(resp)
+        if d is not None:
+            print(f"    count={d.get('matchCount', 0)}")
+
+    print("\nTesting endpoint variations:")
+    for endpoint in endpoint_vars:
+        resp = next(responses)
+        if isinstance(resp, Exception):
+            print(f"  error: {resp}")
+        else:
+            print(f"  {endpoint.split('/')[-1]}: {resp.status_code}")
+
+    return data
 
 
 def fetch_matches_with_bookmark(session, test_guid, bookmark_page=None):
@@ -888,6 +1281,24 @@ def fetch_matches_secure_api(session, test_guid, page=1, base_url="https://www.a
         return None
 
 
+SECURE_API_WORKERS = 8
+
+
+def _secure_page_count(data):
+    """
+    Number of /dna/secure match pages, from the page count or total reported
+    on page 1 (whose size gives the page size). None if neither is present.
+    """
+    pages = data.get("pageCount") or data.get("totalPages")
+    if pages:
+        return pages
+    total = data.get("totalMatches")
+    per_page = sum(len(group.get("matches", [])) for group in data.get("matchGroups", []))
+    if total and per_page:
+        return math.ceil(total / per_page)
+    return None
+
+
 def fetch_all_matches(session, test_guid):
     """Fetch all DNA matches using multiple strategies."""
     print("\nFetching all DNA matches...")
@@ -910,10 +1321,31 @@ def fetch_all_matches(session, test_guid):
     if not working_base:
         print("    Secure API not available on any domain", flush=True)
     else:
+        max_page = _secure_page_count(data)
+        if max_page:
+            print(f"    {max_page} pages to fetch", flush=True)
+        else:
+            print("    No match total in response; paging until results run out", flush=True)
+            max_page = 200  # Safety limit
+        executor = ThreadPoolExecutor(max_workers=SECURE_API_WORKERS)
+
+        # Keep a window of pages in flight; results are still handled in page
+        # order. Page 1 was already fetched while probing the domains.
+        first_page = Future()
+        first_page.set_result(data)
+        in_flight = {1: first_page}
+        for n in range(2, min(SECURE_API_WORKERS, max_page) + 1):
+            in_flight[n] = executor.submit(fetch_matches_secure_api, session, test_guid, n, working_base)
+        next_page = len(in_flight) + 1
+
         page = 1
         consecutive_empty = 0
-        while consecutive_empty < 3:  # Allow some empty pages
-            data = fetch_matches_secure_api(session, test_guid, page, working_base)
+        while consecutive_empty < 3 and page in in_flight:  # Allow some empty pages
+            data = in_flight.pop(page).result()
+            if next_page <= max_page:
+                in_flight[next_page] = executor.submit(fetch_matches_secure_api, session, test_guid,
+                                                       next_page, working_base)
+                next_page += 1
 
             if not data:
                 break
@@ -940,8 +1372,9 @@ def fetch_all_matches(session, test_guid):
                 consecutive_empty += 1
 
             page += 1
-            if page > 200:  # Safety limit
-                break
+
+        # Pages past the end aren't needed
+        executor.shutdown(wait=False, cancel_futures=True)
 
     # Strategy 2: Try discoveryui API if secure didn't work well
     if len(all_matches) < 200:
@@ -1038,84 +1471,148 @@ def parse_match_side(match):
     return "unknown"
 
 
-def import_to_database(matches, db_path):
+def connect_db(db_path=DB_PATH):
+    """Open the genealogy database tuned for bulk imports (WAL, relaxed fsync)."""
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")  # 64MB page cache
+    conn.execute("PRAGMA mmap_size=268435456")
+    ensure_match_indexes(conn)
+    return conn
+
+
+def ensure_match_indexes(conn):
+    """Index the dna_match columns the importers look matches up by."""
+    try:
+        with conn:
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_dna_match_ancestry_id ON dna_match(ancestry_id)")
+            # Also serves name-only lookups (leftmost column of the index)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_dna_match_name_cm ON dna_match(name, shared_cm)")
+        # Refresh planner stats; a no-op unless the indexes are new or stale
+        conn.execute("PRAGMA optimize")
+    except sqlite3.OperationalError:
+        pass  # No dna_match table in this database
+
+
+# Older SQLite builds allow at most 999 bound parameters per statement
+SQLITE_MAX_PARAMS = 999
+
+# scrape_state key for the last match list page whose matches are all saved
+MATCH_LIST_PAGE_KEY = "match_list_page"
+
+
+def _insert_rows(cursor, table, columns, rows):
+    """
+    Insert rows with multi-row INSERT ... VALUES (...), (...) statements, as
+    many rows to a statement as SQLITE_MAX_PARAMS allows, so SQLite steps one
+    statement per chunk rather than one per row.
+    """
+    per_statement = SQLITE_MAX_PARAMS // len(columns)
+    head = f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+    group = f"({', '.join('?' * len(columns))})"
+    for start in range(0, len(rows), per_statement):
+        chunk = rows[start:start + per_statement]
+        # Full chunks all share one statement text, so sqlite3 prepares it once
+        cursor.execute(head + ", ".join([group] * len(chunk)),
+                       [value for row in chunk for value in row])
+
+
+def _name_cm_key(name, shared_cm):
+    """Dedup key for a match without a usable ancestry_id: name plus cM to 0.1."""
+    return (name, round(shared_cm or 0, 1))
+
+
+def _load_existing_matches(cursor):
+    """
+    Load the dedup keys for every dna_match row in one pass: the set of known
+    ancestry_ids, and a dict of _name_cm_key -> [id, ancestry_id, linked_tree_id].
+    """
+    known_ids = set()
+    by_name_cm = {}
+    cursor.execute("SELECT id, ancestry_id, linked_tree_id, name, shared_cm FROM dna_match")
+    for row_id, ancestry_id, linked_tree_id, name, shared_cm in cursor:
+        if ancestry_id:
+            known_ids.add(ancestry_id)
+        if shared_cm is not None:
+            by_name_cm.setdefault(_name_cm_key(name, shared_cm), [row_id, ancestry_id, linked_tree_id])
+    return known_ids, by_name_cm
+
+
+def load_known_guids(db_path):
+    """guid_keys of every dna_match ancestry_id, so a re-run can skip matches already imported."""
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT ancestry_id FROM dna_match WHERE ancestry_id IS NOT NULL")
+        return {guid_key(row[0]) for row in rows}
+    finally:
+        conn.close()
+
+
+def _row_from_match(match, created_at):
+    """dna_match insert row for one matches-list API match."""
+    # Relationship data is nested
+    rel_data = match.get("relationship", {})
+    # Tree info (may be in different location or not present)
+    tree_info = match.get("treeInfo") or match.get("linkedTree") or {}
+    return (
+        match.get("testGuid"),
+        match.get("displayName") or match.get("publicDisplayName") or "Unknown",
+        rel_data.get("sharedCentimorgans", 0),
+        rel_data.get("sharedSegments"),
+        match.get("relationshipLabel"),
+        parse_match_side(match),
+        bool(tree_info) or match.get("hasLinkedTree", False),
+        tree_info.get("treeSize") or tree_info.get("personCount"),
+        created_at,
+    )
+
+
+def import_to_database(matches, db_path, batch_size=5000):
     """Import matches into SQLite database."""
     print(f"\nImporting to database: {db_path}")
 
-    conn = sqlite3.connect(db_path)
+    conn = connect_db(db_path)
     cursor = conn.cursor()
 
     imported = 0
     skipped = 0
+    # Existing rows are checked in memory rather than with two SELECTs per match
+    known_ids, by_name_cm = _load_existing_matches(cursor)
+    created_at = datetime.now().isoformat()
 
-    for match in matches:
-        try:
-            # Extract fields from Ancestry API structure
-            ancestry_id = match.get("testGuid")
-            name = match.get("displayName") or match.get("publicDisplayName") or "Unknown"
-
-            # Relationship data is nested
-            rel_data = match.get("relationship", {})
-            shared_cm = rel_data.get("sharedCentimorgans", 0)
-            shared_segments = rel_data.get("sharedSegments")
-
-            # Relationship label
-            predicted_rel = match.get("relationshipLabel")
-
-            # Side
-            side = parse_match_side(match)
-
-            # Tree info (may be in different location or not present)
-            tree_info = match.get("treeInfo") or match.get("linkedTree") or {}
-            has_tree = bool(tree_info) or match.get("hasLinkedTree", False)
-            tree_size = tree_info.get("treeSize") or tree_info.get("personCount")
-
-            # Check if exists
-            cursor.execute(
-                "SELECT id FROM dna_match WHERE ancestry_id = ?",
-                (ancestry_id,)
-            )
-            if cursor.fetchone():
-                skipped += 1
+    insert_columns = ("ancestry_id", "name", "shared_cm", "shared_segments", "predicted_relationship",
+                      "match_side", "has_tree", "tree_size", "created_at")
+
+    def new_rows():
+        nonlocal skipped
+        for match in matches:
+            try:
+                row = _row_from_match(match, created_at)
+            except Exception as e:
+                print(f"  Error importing {match.get('matchTestDisplayName', 'unknown')}: {e}")
                 continue
 
-            # Check by name + cM (in case ancestry_id is different)
-            cursor.execute(
-                "SELECT id FROM dna_match WHERE name = ? AND shared_cm = ?",
-                (name, shared_cm)
-            )
-            if cursor.fetchone():
+            # Check if exists, by ancestry_id or by name + cM (in case ancestry_id is different)
+            ancestry_id = row[0]
+            key = _name_cm_key(row[1], row[2])
+            if ancestry_id in known_ids or key in by_name_cm:
                 skipped += 1
                 continue
 
-            # Insert
-            cursor.execute("""
-                INSERT INTO dna_match
-                (ancestry_id, name, shared_cm, shared_segments, predicted_relationship,
-                 match_side, has_tree, tree_size, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                ancestry_id,
-                name,
-                shared_cm,
-                shared_segments,
-                predicted_rel,
-                side,
-                has_tree,
-                tree_size,
-                datetime.now().isoformat()
-            ))
-            imported += 1
-
-            if imported % 100 == 0:
-                conn.commit()
-                print(f"  Imported {imported}...")
-
-        except Exception as e:
-            print(f"  Error importing {match.get('matchTestDisplayName', 'unknown')}: {e}")
-            continue
-
-    conn.commit()
+            if ancestry_id:
+                known_ids.add(ancestry_id)
+            by_name_cm[key] = [None, ancestry_id, None]
+            yield row
+
+    # One transaction for the whole import, inserted batch_size rows at a time
+    rows = new_rows()
+    with conn:
+        while batch := list(itertools.islice(rows, batch_size)):
+            _insert_rows(cursor, "dna_match", insert_columns, batch)
+            imported += len(batch)
+            print(f"  Imported {imported}...")
 
     # Get total count
     cursor.execute("SELECT COUNT(*) FROM dna_match")
@@ -1131,105 +1628,174 @@ def import_to_database(matches, db_path):
     return imported
 
 
-def import_browser_matches(matches, db_path):
-    """Import matches scraped from browser into SQLite database."""
-    print(f"\nImporting browser-scraped matches to database: {db_path}")
+def ensure_scrape_state(conn):
+    """Create the scrape_state table: small integer checkpoints, e.g. the match list page reached."""
+    with conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS scrape_state (k TEXT PRIMARY KEY, v INTEGER)")
+
 
+def load_scrape_state(db_path, key):
+    """The scrape_state value stored under key, or None."""
     conn = sqlite3.connect(db_path)
+    try:
+        ensure_scrape_state(conn)
+        row = conn.execute("SELECT v FROM scrape_state WHERE k = ?", (key,)).fetchone()
+        return row[0] if row else None
+    finally:
+        conn.close()
+
+
+def clear_scrape_state(db_path, key):
+    """Forget the scrape_state value stored under key."""
+    conn = sqlite3.connect(db_path)
+    try:
+        ensure_scrape_state(conn)
+        with conn:
+            conn.execute("DELETE FROM scrape_state WHERE k = ?", (key,))
+    finally:
+        conn.close()
+
+
+def import_browser_matches(matches, db_path, batch_size=200, state=None):
+    """
+    Import matches scraped from browser into SQLite database. matches can be
+    any iterable (e.g. a generator of scraped pages); new rows are written
+    and committed every batch_size rows. state is an optional dict of
+    scrape_state values, which the caller may update as matches are consumed;
+    it's written in the same transaction as each batch, so a checkpoint is
+    never committed ahead of the rows it covers.
+    """
+    print(f"\nImporting browser-scraped matches to database: {db_path}")
+
+    conn = connect_db(db_path)
+    if state is not None:
+        ensure_scrape_state(conn)
+    # A scrape writes for hours: keep more of the index cached and don't stop
+    # to checkpoint the WAL mid-import, it's checkpointed once at the end
+    conn.execute("PRAGMA cache_size=-262144")  # 256MB page cache
+    conn.execute("PRAGMA wal_autocheckpoint=0")
+    # Take the write lock when each batch starts rather than on its first insert
+    conn.isolation_level = "IMMEDIATE"
     cursor = conn.cursor()
 
     imported = 0
     skipped = 0
+    # Existing rows are checked in memory rather than with two SELECTs per match
+    known_ids, by_name_cm = _load_existing_matches(cursor)
+    rows = []
+    updates = []
+
+    insert_columns = ("ancestry_id", "name", "shared_cm", "predicted_relationship", "match_side",
+                      "created_at")
+    # One statement shape for every update so they batch; NULL keeps the old value
+    update_sql = """
+        UPDATE dna_match
+        SET ancestry_id = COALESCE(?, ancestry_id),
+            linked_tree_id = COALESCE(?, linked_tree_id),
+            tree_size = COALESCE(?, tree_size),
+            has_tree = COALESCE(?, has_tree)
+        WHERE id = ?
+    """
 
-    for match in matches:
-        try:
-            # Browser-scraped matches have simpler structure
-            ancestry_id = match.get("ancestry_id")
-            name = match.get("name", "Unknown")
-            shared_cm = match.get("shared_cm", 0)
-            predicted_rel = match.get("predicted_relationship")
+    state_sql = "INSERT INTO scrape_state (k, v) VALUES (?, ?) ON CONFLICT(k) DO UPDATE SET v = excluded.v"
 
-            if not name or name == "Unknown":
-                continue
+    def flush():
+        nonlocal imported
+        with conn:
+            _insert_rows(cursor, "dna_match", insert_columns, rows)
+            cursor.executemany(update_sql, updates)
+            if state:
+                cursor.executemany(state_sql, list(state.items()))
+        imported += len(rows)
+        print(f"  Imported {imported}...", flush=True)
+        rows.clear()
+        updates.clear()
 
-            # Check if exists by ancestry_id
-            if ancestry_id:
-                cursor.execute(
-                    "SELECT id FROM dna_match WHERE ancestry_id = ?",
-                    (ancestry_id,)
-                )
-                if cursor.fetchone():
-                    skipped += 1
-                    continue
+    try:
+        for match in matches:
+            try:
+                # Browser-scraped matches have simpler structure
+                ancestry_id = match.get("ancestry_id")
+                name = match.get("name", "Unknown")
+                shared_cm = match.get("shared_cm", 0)
+                predicted_rel = match.get("predicted_relationship")
 
-            # Check by name + cM
-            cursor.execute(
-                "SELECT id, ancestry_id, linked_tree_id FROM dna_match WHERE name = ? AND ABS(shared_cm - ?) < 0.1",
-                (name, shared_cm or 0)
-            )
-            existing = cursor.fetchone()
-            if existing:
-                # Update ancestry_id if we have it and record doesn't
-                existing_id, existing_ancestry_id, existing_tree_id = existing
-                updates = []
-                params = []
-                if ancestry_id and not existing_ancestry_id:
-                    updates.append("ancestry_id = ?")
-                    params.append(ancestry_id)
-                linked_tree_id = match.get("linked_tree_id")
-                if linked_tree_id and not existing_tree_id:
-                    updates.append("linked_tree_id = ?")
-                    params.append(linked_tree_id)
-                tree_size = match.get("tree_size")
-                if tree_size:
-                    updates.append("tree_size = ?")
-                    params.append(tree_size)
-                has_tree = match.get("has_tree")
-                if has_tree is not None:
-                    updates.append("has_tree = ?")
-                    params.append(1 if has_tree else 0)
-
-                if updates:
-                    params.append(existing_id)
-                    cursor.execute(f"UPDATE dna_match SET {', '.join(updates)} WHERE id = ?", params)
-                skipped += 1
-                continue
+                if not name or name == "Unknown":
+                    continue
 
-            # Get side info if available - map parent1/parent2 to unknown
-            match_side = match.get("match_side", "unknown")
-            if match_side in ("parent1", "parent2"):
-                match_side = "unknown"  # Ancestry hasn't determined which parent yet
-
-            # Insert
-            cursor.execute("""
-                INSERT INTO dna_match
-                (ancestry_id, name, shared_cm, predicted_relationship, match_side, created_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                ancestry_id,
-                name,
-                shared_cm,
-                predicted_rel,
-                match_side,
-                datetime.now().isoformat()
-            ))
-            imported += 1
-
-            if imported % 100 == 0:
-                conn.commit()
-                print(f"  Imported {imported}...", flush=True)
+                # Check if exists by ancestry_id
+                if ancestry_id and ancestry_id in known_ids:
+                    skipped += 1
+                    continue
 
-        except Exception as e:
-            print(f"  Error importing {match.get('name', 'unknown')}: {e}")
-            continue
+                # Check by name + cM
+                key = _name_cm_key(name, shared_cm)
+                existing = by_name_cm.get(key)
+                if existing:
+                    # Update ancestry_id if we have it and record doesn't. Rows added
+                    # earlier in this import (no id yet) are just skipped.
+                    existing_id, existing_ancestry_id, existing_tree_id = existing
+                    new_ancestry_id = None
+                    if ancestry_id and not existing_ancestry_id:
+                        new_ancestry_id = ancestry_id
+                        existing[1] = ancestry_id
+                        known_ids.add(ancestry_id)
+                    linked_tree_id = match.get("linked_tree_id")
+                    if linked_tree_id and not existing_tree_id:
+                        existing[2] = linked_tree_id
+                    else:
+                        linked_tree_id = None
+                    tree_size = match.get("tree_size") or None
+                    has_tree = match.get("has_tree")
+                    if has_tree is not None:
+                        has_tree = 1 if has_tree else 0
+
+                    changes = (new_ancestry_id, linked_tree_id, tree_size, has_tree)
+                    if existing_id is not None and any(v is not None for v in changes):
+                        updates.append((*changes, existing_id))
+                    skipped += 1
+                    continue
 
-    conn.commit()
+                # Get side info if available - map parent1/parent2 to unknown
+                match_side = match.get("match_side", "unknown")
+                if match_side in ("parent1", "parent2"):
+                    match_side = "unknown"  # Ancestry hasn't determined which parent yet
+
+                if ancestry_id:
+                    known_ids.add(ancestry_id)
+                by_name_cm[key] = [None, ancestry_id, None]
+                rows.append((
+                    ancestry_id,
+                    name,
+                    shared_cm,
+                    predicted_rel,
+                    match_side,
+                    datetime.now().isoformat()
+                ))
+                if len(rows) + len(updates) >= batch_size:
+                    flush()
 
-    # Get total count
-    cursor.execute("SELECT COUNT(*) FROM dna_match")
-    total = cursor.fetchone()[0]
+            except Exception as e:
+                print(f"  Error importing {match.get('name', 'unknown')}: {e}")
+                continue
 
-    conn.close()
+        # Final partial batch of inserts and updates
+        with conn:
+            _insert_rows(cursor, "dna_match", insert_columns, rows)
+            cursor.executemany(update_sql, updates)
+            if state:
+                cursor.executemany(state_sql, list(state.items()))
+        imported += len(rows)
+
+        # Get total count
+        cursor.execute("SELECT COUNT(*) FROM dna_match")
+        total = cursor.fetchone()[0]
+    finally:
+        # Fold the WAL back into the database and leave it truncated, then
+        # refresh planner stats; the PRAGMAs above die with the connection
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("PRAGMA optimize")
+        conn.close()
 
     print(f"\nImport complete:")
     print(f"  New imports:  {imported}")
@@ -1239,7 +1805,188 @@ def import_browser_matches(matches, db_path):
     return imported
 
 
-def scan_trees(test_guid=None, headless=True, limit=None, min_cm=None):
+SCAN_WORKERS = 6
+# Match pages opened per second across all scan workers, to stay clear of
+# Ancestry's rate limiting
+SCAN_MAX_RATE = 2.0
+
+# Rendered on a match's trees tab whether or not they have a linked tree
+TREE_CARD_SELECTOR = '.linkedTreeCard, .treeCard, [class*="TreeCard"], [class*="noTree"], [class*="no-tree"]'
+
+
+@contextlib.contextmanager
+def ancestry_browser(headless=True):
+    """
+    Launch a scan browser and yield (loop, context): an event loop and an
+    async Playwright BrowserContext carrying the Chrome cookies, with
+    non-essential resources blocked. Pass it as browser= to scan_trees and
+    scan_shared_matches to run several scans without relaunching Chromium.
+    """
+    from playwright.async_api import async_playwright
+
+    async def start():
+        p = await async_playwright().start()
+        browser = await launch_browser_async(p, headless)
+        context = await browser.new_context(
+            user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
+            storage_state=saved_storage_state(),
+        )
+        # Chrome's current cookies win over any saved ones with the same name
+        await context.add_cookies(list(_playwright_cookies()))
+        # Everything is read with page.evaluate, so skip images, fonts and trackers
+        await context.route("**/*", block_nonessential_async)
+        await context.add_init_script(EXTRACT_MATCHES_JS)
+        return p, browser, context
+
+    async def stop(p, browser, context):
+        if PERSIST_STORAGE_STATE:
+            try:
+                await context.storage_state(path=str(STORAGE_STATE_PATH))
+            except Exception as e:
+                print(f"  Warning: couldn't save browser state: {e}", flush=True)
+        await context.close()
+        await browser.close()
+        await p.stop()
+
+    loop = asyncio.new_event_loop()
+    try:
+        p, browser, context = loop.run_until_complete(start())
+        try:
+            yield loop, context
+        finally:
+            loop.run_until_complete(stop(p, browser, context))
+    finally:
+        loop.close()
+
+
+def _run_scan(browser, headless, matches, test_guid, scan_one, record):
+    """Run _scan_with_pages on `browser`, launching one for just this scan if None."""
+    if browser is None:
+        with ancestry_browser(headless) as browser:
+            return _run_scan(browser, headless, matches, test_guid, scan_one, record)
+    loop, context = browser
+    loop.run_until_complete(_scan_with_pages(context, matches, test_guid, scan_one, record))
+
+
+async def _scan_pages(context, items, test_guid, scan_one, workers=SCAN_WORKERS, max_rate=SCAN_MAX_RATE):
+    """
+    Run scan_one(page, test_guid, item) for every item across `workers`
+    concurrent pages of one browser context, so their network waits overlap.
+    Scans start at no more than max_rate per second between them.
+    Yields (i, item, result) as each scan finishes, result being the exception
+    raised if it failed. Closing the generator early stops the workers.
+    """
+    loop = asyncio.get_running_loop()
+    throttle_lock = asyncio.Lock()
+    next_start = loop.time()
+
+    async def throttle():
+        """Wait for the next start slot, spaced 1/max_rate apart."""
+        nonlocal next_start
+        async with throttle_lock:
+            delay = next_start - loop.time()
+            next_start = max(next_start, loop.time()) + 1 / max_rate
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    # Get our test GUID if not provided
+    if not test_guid:
+        page = await context.new_page()
+        await page.goto(f"{ANCESTRY_BASE_URL}/dna", wait_until="domcontentloaded", timeout=60000)
+        await page.wait_for_timeout(2000)
+        guid_match = GUID_RE.search(page.url)
+        if guid_match:
+            test_guid = guid_match.group(1).upper()
+            print(f"Test GUID: {test_guid}")
+        await page.close()
+
+    todo = asyncio.Queue()
+    for item in enumerate(items):
+        todo.put_nowait(item)
+    results = asyncio.Queue()
+
+    async def worker():
+        page = await context.new_page()
+        try:
+            while not todo.empty():
+                i, item = todo.get_nowait()
+                await throttle()
+                try:
+                    result = await scan_one(page, test_guid, item)
+                except Exception as e:
+                    result = e
+                await results.put((i, item, result))
+        finally:
+            await page.close()
+
+    async def run_workers():
+        try:
+            await asyncio.gather(*(worker() for _ in range(min(workers, len(items)))))
+        finally:
+            await results.put(None)
+
+    scanning = asyncio.create_task(run_workers())
+    try:
+        while (result := await results.get()) is not None:
+            yield result
+        await scanning
+    finally:
+        if not scanning.done():
+            scanning.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await scanning
+
+
+async def _scan_with_pages(context, matches, test_guid, scan_one, record, workers=SCAN_WORKERS,
+                          max_rate=SCAN_MAX_RATE):
+    """
+    Run _scan_pages over matches, passing each result to record(i, match, result)
+    from a single consumer, keeping database writes on one connection.
+    """
+    try:
+        async for result in _scan_pages(context, matches, test_guid, scan_one, workers, max_rate):
+            record(*result)
+    except Exception as e:
+        print(f"\nError: {e}")
+        traceback.print_exc()
+
+
+async def _scrape_list_page(page, test_guid, page_number):
+    """
+    Load one page of the match list UI by its ?currentPage= URL and return its
+    matches, read from the matches-list XHR or, failing that, from the DOM.
+    """
+    url = (f"{ANCESTRY_BASE_URL}/discoveryui-matches/list/{test_guid}"
+           f"?sharedDna=allMatches&currentPage={page_number}")
+    for attempt in range(3):
+        try:
+            async with page.expect_response(
+                    lambda r: "/matches/list" in r.url and r.status == 200, timeout=45000) as response_info:
+                await page.goto(url, wait_until="domcontentloaded", timeout=45000)
+            response = await response_info.value
+            break
+        except Exception:
+            if attempt == 2:
+                raise
+            await page.wait_for_timeout(5000)
+
+    try:
+        found = api_page_to_scraped(await response.json())
+        if found:
+            return found
+    except Exception:
+        pass
+    # The XHR has landed but cards may not have rendered yet
+    try:
+        await page.wait_for_selector('.matchEntry', state='attached', timeout=15000)
+    except Exception:
+        pass  # Empty page; extraction returns nothing
+    columns = loads_json(await page.evaluate("() => window.__extractMatches()"))
+    return [dict(zip(MATCH_FIELDS, row))
+            for row in zip(*(columns[field] for field in MATCH_FIELDS))]
+
+
+def scan_trees(test_guid=None, headless=True, limit=None, min_cm=None, browser=None, force=False):
     """
     Scan DNA matches for tree information (size, public/private).
     Updates the database with tree_size and has_public_tree for each match.
@@ -1249,15 +1996,17 @@ def scan_trees(test_guid=None, headless=True, limit=None, min_cm=None):
         headless: Run browser in headless mode
         limit: Maximum number of matches to scan (None = all)
         min_cm: Only scan matches with at least this many cM
+        browser: (loop, context) from ancestry_browser() to reuse; launches one if None
+        force: Rescan matches that already have tree info
     """
-    from playwright.sync_api import sync_playwright
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 
     print("\n" + "=" * 60)
     print("SCANNING MATCHES FOR TREE INFORMATION")
     print("=" * 60)
 
     # Get matches from database that need scanning
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect_db()
     cursor = conn.cursor()
 
     query = """
@@ -1267,6 +2016,11 @@ def scan_trees(test_guid=None, headless=True, limit=None, min_cm=None):
     """
     params = []
 
+    # has_public_tree is set by this scan and by recheck_match_trees.py, in
+    # both cases alongside has_tree and tree_size after a successful check
+    if not force:
+        query += " AND has_public_tree IS NULL"
+
     if min_cm:
         query += " AND shared_cm >= ?"
         params.append(min_cm)
@@ -1288,20 +2042,7 @@ def scan_trees(test_guid=None, headless=True, limit=None, min_cm=None):
 
     # Get cookies
     print("Extracting cookies from Chrome...", flush=True)
-    cookie_list = []
-    for domain in [".ancestry.co.uk", ".ancestry.com"]:
-        try:
-            cookies = browser_cookie3.chrome(domain_name=domain)
-            for cookie in cookies:
-                cookie_list.append({
-                    "name": cookie.name,
-                    "value": cookie.value,
-                    "domain": cookie.domain,
-                    "path": cookie.path,
-                    "secure": bool(cookie.secure),
-                })
-        except:
-            pass
+    cookie_list = list(_playwright_cookies())
 
     if not cookie_list:
         print("No cookies found - log into Ancestry in Chrome first")
@@ -1310,128 +2051,119 @@ def scan_trees(test_guid=None, headless=True, limit=None, min_cm=None):
     updated = 0
     with_public_tree = 0
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=headless)
-        context = browser.new_context(
-            user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
-        )
-        context.add_cookies(cookie_list)
-        page = context.new_page()
-
-        try:
-            # Get our test GUID if not provided
-            if not test_guid:
-                page.goto(f"{ANCESTRY_BASE_URL}/dna", wait_until="domcontentloaded", timeout=60000)
-                time.sleep(2)
-                guid_match = re.search(r'/([A-F0-9]{8}-[A-F0-9]{4}-[A-F0-9]{4}-[A-F0-9]{4}-[A-F0-9]{12})',
-                                       page.url, re.IGNORECASE)
-                if guid_match:
-                    test_guid = guid_match.group(1).upper()
-                    print(f"Test GUID: {test_guid}")
+    tree_js = """
+        () => {
+            const result = {
+                has_tree: false,
+                is_public: false,
+                tree_size: null,
+                tree_id: null
+            };
+
+            // Look for linked tree card
+            const treeCard = document.querySelector('.linkedTreeCard, .treeCard, [class*="TreeCard"]');
+            if (treeCard) {
+                result.has_tree = true;
+
+                // Check for "Public" text
+                const text = treeCard.textContent.toLowerCase();
+                result.is_public = text.includes('public');
+
+                // Get person count - look for patterns like "241 people" or "50 people"
+                const countMatch = text.match(/(\\d+)\\s*(?:people|person)/i);
+                if (countMatch) {
+                    result.tree_size = parseInt(countMatch[1]);
+                }
 
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
+                // Also try to find it in a specific element
+                const countEl = treeCard.querySelector('[class*="personCount"], [class*="treeSize"], [class*="count"]');
+                if (countEl && !result.tree_size) {
+                    const countText = countEl.textContent;
+                    const m = countText.match(/(\\d+)/);
+                    if (m) result.tree_size = parseInt(m[1]);
+                }
 
-            for i, (match_id, match_guid, name, cm) in enumerate(matches):
-                print(f"\n[{i+1}/{len(matches)}] {name} ({cm:.0f} cM)...", flush=True)
+                // Get tree link/ID
+                const link = treeCard.querySelector('a[href*="/tree/"]');
+                if (link) {
+                    const href = link.getAttribute('href');
+                    const treeMatch = href.match(/\\/tree\\/(\\d+)/);
+                    if (treeMatch) result.tree_id = treeMatch[1];
+                }
+            }
 
-                try:
-                    # Navigate to the trees tab for this match
-                    trees_url = f"{ANCESTRY_BASE_URL}/discoveryui-matches/compare/{test_guid}/with/{match_guid}/trees"
-                    page.goto(trees_url, wait_until="domcontentloaded", timeout=30000)
-                    time.sleep(2)
+            // Also check for "No linked tree" message
+            const noTree = document.querySelector('[class*="noTree"], [class*="no-tree"]');
+            if (noTree && noTree.textContent.toLowerCase().includes('no')) {
+                result.has_tree = false;
+            }
 
-                    # Extract tree info from the page
-                    tree_info = page.evaluate("""
-                        () => {
-                            const result = {
-                                has_tree: false,
-                                is_public: false,
-                                tree_size: null,
-                                tree_id: null
-                            };
-
-                            // Look for linked tree card
-                            const treeCard = document.querySelector('.linkedTreeCard, .treeCard, [class*="TreeCard"]');
-                            if (treeCard) {
-                                result.has_tree = true;
-
-                                // Check for "Public" text
-                                const text = treeCard.textContent.toLowerCase();
-                                result.is_public = text.includes('public');
-
-                                // Get person count - look for patterns like "241 people" or "50 people"
-                                const countMatch = text.match(/(\\d+)\\s*(?:people|person)/i);
-                                if (countMatch) {
-                                    result.tree_size = parseInt(countMatch[1]);
-                                }
-
-                                // Also try to find it in a specific element
-                                const countEl = treeCard.querySelector('[class*="personCount"], [class*="treeSize"], [class*="count"]');
-                                if (countEl && !result.tree_size) {
-                                    const countText = countEl.textContent;
-                                    const m = countText.match(/(\\d+)/);
-                                    if (m) result.tree_size = parseInt(m[1]);
-                                }
-
-                                // Get tree link/ID
-                                const link = treeCard.querySelector('a[href*="/tree/"]');
-                                if (link) {
-                                    const href = link.getAttribute('href');
-                                    const treeMatch = href.match(/\\/tree\\/(\\d+)/);
-                                    if (treeMatch) result.tree_id = treeMatch[1];
-                                }
-                            }
-
-                            // Also check for "No linked tree" message
-                            const noTree = document.querySelector('[class*="noTree"], [class*="no-tree"]');
-                            if (noTree && noTree.textContent.toLowerCase().includes('no')) {
-                                result.has_tree = false;
-                            }
-
-                            return result;
-                        }
-                    """)
-
-                    # Update database
-                    cursor.execute("""
-                        UPDATE dna_match
-                        SET has_tree = ?,
-                            tree_size = ?,
-                            has_public_tree = ?
-                        WHERE id = ?
-                    """, (
-                        tree_info['has_tree'],
-                        tree_info['tree_size'],
-                        tree_info['is_public'],
-                        match_id
-                    ))
-                    conn.commit()
-                    updated += 1
-
-                    if tree_info['is_public'] and tree_info['tree_size']:
-                        with_public_tree += 1
-                        print(f"  ✓ PUBLIC tree: {tree_info['tree_size']} people", flush=True)
-                    elif tree_info['has_tree']:
-                        size_str = f"{tree_info['tree_size']} people" if tree_info['tree_size'] else "size unknown"
-                        print(f"  - Private tree ({size_str})", flush=True)
-                    else:
-                        print(f"  - No linked tree", flush=True)
+            return result;
+        }
+    """
 
-                except Exception as e:
-                    print(f"  Error: {e}", flush=True)
-                    continue
+    async def scan_one(page, test_guid, match):
+        match_id, match_guid, name, cm = match
+        # Navigate to the trees tab for this match
+        trees_url = f"{ANCESTRY_BASE_URL}/discoveryui-matches/compare/{test_guid}/with/{match_guid}/trees"
+        await page.goto(trees_url, wait_until="domcontentloaded", timeout=30000)
+        # Proceed as soon as either a tree card or the no-tree message renders
+        try:
+            await page.wait_for_selector(TREE_CARD_SELECTOR, state="attached", timeout=15000)
+        except PlaywrightTimeoutError:
+            pass  # Neither rendered; tree_js reports has_tree = false
 
-            conn.close()
+        # Extract tree info from the page
+        return await page.evaluate(tree_js)
 
-        except Exception as e:
-            print(f"\nError: {e}")
-            import traceback
-            traceback.print_exc()
+    conn = connect_db()
+    cursor = conn.cursor()
+    # Tree info updates, written in batches
+    rows = []
+
+    def flush():
+        with conn:
+            cursor.executemany("""
+                UPDATE dna_match
+                SET has_tree = ?,
+                    tree_size = ?,
+                    has_public_tree = ?
+                WHERE id = ?
+            """, rows)
+        rows.clear()
+
+    def record(i, match, tree_info):
+        nonlocal updated, with_public_tree
+        match_id, match_guid, name, cm = match
+        print(f"\n[{i+1}/{len(matches)}] {name} ({cm:.0f} cM)...", flush=True)
+        if isinstance(tree_info, Exception):
+            print(f"  Error: {tree_info}", flush=True)
+            return
+
+        rows.append((
+            tree_info['has_tree'],
+            tree_info['tree_size'],
+            tree_info['is_public'],
+            match_id
+        ))
+        if len(rows) >= 50:
+            flush()
+        updated += 1
+
+        if tree_info['is_public'] and tree_info['tree_size']:
+            with_public_tree += 1
+            print(f"  ✓ PUBLIC tree: {tree_info['tree_size']} people", flush=True)
+        elif tree_info['has_tree']:
+            size_str = f"{tree_info['tree_size']} people" if tree_info['tree_size'] else "size unknown"
+            print(f"  - Private tree ({size_str})", flush=True)
+        else:
+            print(f"  - No linked tree", flush=True)
 
-        finally:
-            context.close()
-            browser.close()
+    try:
+        _run_scan(browser, headless, matches, test_guid, scan_one, record)
+    finally:
+        flush()
+        conn.close()
 
     print(f"\n" + "=" * 60)
     print(f"SCAN COMPLETE")
@@ -1440,7 +2172,7 @@ def scan_trees(test_guid=None, headless=True, limit=None, min_cm=None):
     print(f"  With public tree: {with_public_tree}")
 
     # Show top public trees
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect_db()
     cursor = conn.cursor()
     cursor.execute("""
         SELECT name, shared_cm, tree_size
@@ -1459,7 +2191,7 @@ def scan_trees(test_guid=None, headless=True, limit=None, min_cm=None):
             print(f"  {name:<30} {cm:>6.0f} cM  {size:>4} people")
 
 
-def scan_shared_matches(test_guid=None, headless=True, limit=None, min_cm=None):
+def scan_shared_matches(test_guid=None, headless=True, limit=None, min_cm=None, browser=None, force=False):
     """
     Batch scan shared matches for top DNA matches and store in database.
 
@@ -1468,29 +2200,39 @@ def scan_shared_matches(test_guid=None, headless=True, limit=None, min_cm=None):
         headless: Run browser in headless mode
         limit: Maximum number of matches to scan
         min_cm: Only scan matches with at least this many cM
+        browser: (loop, context) from ancestry_browser() to reuse; launches one if None
+        force: Rescan matches that already have shared matches stored
     """
-    from playwright.sync_api import sync_playwright
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 
     print("\n" + "=" * 60)
     print("SCANNING SHARED MATCHES")
     print("=" * 60)
 
     # Get matches to scan
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect_db()
     cursor = conn.cursor()
 
     query = """
-        SELECT id, ancestry_id, name, shared_cm
-        FROM dna_match
-        WHERE ancestry_id IS NOT NULL
+        SELECT dm.id, dm.ancestry_id, dm.name, dm.shared_cm
+        FROM dna_match dm
     """
     params = []
 
+    if not force:
+        # Only matches with nothing stored in shared_match yet
+        query += """
+            LEFT JOIN (SELECT DISTINCT match1_id FROM shared_match) sm ON sm.match1_id = dm.id
+            WHERE sm.match1_id IS NULL AND dm.ancestry_id IS NOT NULL
+        """
+    else:
+        query += " WHERE dm.ancestry_id IS NOT NULL"
+
     if min_cm:
-        query += " AND shared_cm >= ?"
+        query += " AND dm.shared_cm >= ?"
         params.append(min_cm)
 
-    query += " ORDER BY shared_cm DESC"
+    query += " ORDER BY dm.shared_cm DESC"
 
     if limit:
         query += " LIMIT ?"
@@ -1507,20 +2249,7 @@ def scan_shared_matches(test_guid=None, headless=True, limit=None, min_cm=None):
 
     # Get cookies
     print("Extracting cookies from Chrome...", flush=True)
-    cookie_list = []
-    for domain in [".ancestry.co.uk", ".ancestry.com"]:
-        try:
-            cookies = browser_cookie3.chrome(domain_name=domain)
-            for cookie in cookies:
-                cookie_list.append({
-                    "name": cookie.name,
-                    "value": cookie.value,
-                    "domain": cookie.domain,
-                    "path": cookie.path,
-                    "secure": bool(cookie.secure),
-                })
-        except:
-            pass
+    cookie_list = list(_playwright_cookies())
 
     if not cookie_list:
         print("No cookies found - log into Ancestry in Chrome first")
@@ -1528,115 +2257,135 @@ def scan_shared_matches(test_guid=None, headless=True, limit=None, min_cm=None):
 
     total_imported = 0
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=headless)
-        context = browser.new_context(
-            user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
-        )
-        context.add_cookies(cookie_list)
-        page = context.new_page()
+    # Scrolls until the entry count stops growing, then extracts every
+    # entry in one pass - a single round trip per match instead of one
+    # query_selector_all + scroll per iteration.
+    shared_js = """
+        async () => {
+            const CM_RE = /(\\d[\\d,]*)\\s*cM/i;
+            // Digits-and-commas integer, without strip + parseFloat
+            const toInt = (s) => {
+                let v = 0;
+                for (let i = 0; i < s.length; i++) {
+                    const d = s.charCodeAt(i) - 48;
+                    if (d >= 0 && d <= 9) v = v * 10 + d;
+                }
+                return v;
+            };
+            const parseCm = (el) => {
+                const m = el ? el.textContent.match(CM_RE) : null;
+                return m ? toInt(m[1]) : null;
+            };
+
+            let prevCount = -1;
+            for (let i = 0; i < 10; i++) {
+                const count = document.querySelectorAll('.matchOfMatchEntry').length;
+                if (count === prevCount) break;
+                prevCount = count;
+                window.scrollTo(0, document.body.scrollHeight);
+                await new Promise((resolve) => setTimeout(resolve, 800));
+            }
+
+            // shared_match keeps one row per (match, shared match name), so an
+            // entry the list renders twice is only parsed the first time
+            const seen = new Set();
+            const matches = [];
+            for (const entry of document.querySelectorAll('.matchOfMatchEntry')) {
+                const nameEl = entry.querySelector('a.matchInfoName');
+                const name = nameEl ? nameEl.textContent.trim() : null;
+                if (!name || seen.has(name)) continue;
+                seen.add(name);
+                matches.push({
+                    name,
+                    your_cm: parseCm(entry.querySelector('.yourSharedDNA')),
+                    match_cm: parseCm(entry.querySelector('.matchSharedDNA')),
+                });
+            }
+            return matches;
+        }
+    """
 
+    async def scan_one(page, test_guid, match):
+        match_id, match_guid, name, cm = match
+        # Navigate to shared matches page
+        shared_url = f"{ANCESTRY_BASE_URL}/discoveryui-matches/compare/{test_guid}/with/{match_guid}/sharedmatches"
+        await page.goto(shared_url, wait_until="domcontentloaded", timeout=30000)
         try:
-            # Get test GUID
-            if not test_guid:
-                page.goto(f"{ANCESTRY_BASE_URL}/dna", wait_until="domcontentloaded", timeout=60000)
-                time.sleep(2)
-                guid_match = re.search(r'/([A-F0-9]{8}-[A-F0-9]{4}-[A-F0-9]{4}-[A-F0-9]{4}-[A-F0-9]{12})',
-                                       page.url, re.IGNORECASE)
-                if guid_match:
-                    test_guid = guid_match.group(1).upper()
-                    print(f"Test GUID: {test_guid}")
+            await page.wait_for_selector('.matchOfMatchEntry', state="attached", timeout=10000)
+        except PlaywrightTimeoutError:
+            pass  # No shared matches for this match
 
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
+        # Scroll to load all shared matches and extract them
+        return await page.evaluate(shared_js)
 
-            for i, (match_id, match_guid, name, cm) in enumerate(matches):
-                print(f"\n[{i+1}/{len(matches)}] {name} ({cm:.0f} cM)...", flush=True)
-
-                try:
-                    # Navigate to shared matches page
-                    shared_url = f"{ANCESTRY_BASE_URL}/discoveryui-matches/compare/{test_guid}/with/{match_guid}/sharedmatches"
-                    page.goto(shared_url, wait_until="domcontentloaded", timeout=30000)
-                    time.sleep(2)
-
-                    # Scroll to load all shared matches
-                    prev_count = 0
-                    for _ in range(5):
-                        elements = page.query_selector_all('.matchOfMatchEntry')
-                        if len(elements) == prev_count:
-                            break
-                        prev_count = len(elements)
-                        page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                        time.sleep(1)
-
-                    # Extract shared matches
-                    shared_data = page.evaluate("""
-                        () => {
-                            const matches = [];
-                            document.querySelectorAll('.matchOfMatchEntry').forEach((entry) => {
-                                try {
-                                    const nameEl = entry.querySelector('a.matchInfoName');
-                                    const name = nameEl ? nameEl.textContent.trim() : null;
-
-                                    const yourDnaEl = entry.querySelector('.yourSharedDNA');
-                                    let yourCm = null;
-                                    if (yourDnaEl) {
-                                        const cmMatch = yourDnaEl.textContent.match(/([\\d,]+)\\s*cM/i);
-                                        if (cmMatch) yourCm = parseFloat(cmMatch[1].replace(/,/g, ''));
-                                    }
-
-                                    const matchDnaEl = entry.querySelector('.matchSharedDNA');
-                                    let matchCm = null;
-                                    if (matchDnaEl) {
-                                        const cmMatch = matchDnaEl.textContent.match(/([\\d,]+)\\s*cM/i);
-                                        if (cmMatch) matchCm = parseFloat(cmMatch[1].replace(/,/g, ''));
-                                    }
-
-                                    if (name) {
-                                        matches.push({name, your_cm: yourCm, match_cm: matchCm});
-                                    }
-                                } catch(e) {}
-                            });
-                            return matches;
-                        }
-                    """)
-
-                    # Store in database
-                    imported = 0
-                    for shared in shared_data:
-                        # Try to find match2 in database
-                        cursor.execute("SELECT id FROM dna_match WHERE name = ?", (shared['name'],))
-                        row = cursor.fetchone()
-                        match2_id = row[0] if row else None
-
-                        try:
-                            cursor.execute("""
-                                INSERT OR REPLACE INTO shared_match
-                                (match1_id, match2_id, match2_name, match1_to_match2_cm, you_to_match2_cm)
-                                VALUES (?, ?, ?, ?, ?)
-                            """, (match_id, match2_id, shared['name'], shared['match_cm'], shared['your_cm']))
-                            imported += 1
-                        except:
-                            pass
-
-                    conn.commit()
-                    total_imported += imported
-                    print(f"  Found {len(shared_data)} shared matches, stored {imported}", flush=True)
-
-                except Exception as e:
-                    print(f"  Error: {e}", flush=True)
-                    continue
+    conn = connect_db()
+    cursor = conn.cursor()
 
-            conn.close()
+    # Resolve match2 names in memory rather than one SELECT per shared match.
+    # Descending id so the lowest id wins for duplicate names, as before.
+    cursor.execute("SELECT id, name FROM dna_match ORDER BY id DESC")
+    name_to_id = {name: match2_id for match2_id, name in cursor.fetchall()}
+
+    # Shared-match rows are written in batches across matches, one commit each
+    rows = []
+
+    # Upsert in place rather than REPLACE's delete + reinsert
+    upsert_sql = """
+        INSERT INTO shared_match
+        (match1_id, match2_id, match2_name, match1_to_match2_cm, you_to_match2_cm)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(match1_id, match2_name) DO UPDATE SET
+            match2_id = excluded.match2_id,
+            match1_to_match2_cm = excluded.match1_to_match2_cm,
+            you_to_match2_cm = excluded.you_to_match2_cm
+    """
 
-        except Exception as e:
-            print(f"\nError: {e}")
-            import traceback
-            traceback.print_exc()
+    def flush():
+        nonlocal total_imported
+        try:
+            with conn:
+                cursor.executemany(upsert_sql, rows)
+            total_imported += len(rows)
+        except sqlite3.Error as e:
+            # The batch spans many matches; retry them one at a time so a bad
+            # row only costs its own match's list
+            print(f"  Error storing shared matches ({e}), retrying match by match", flush=True)
+            lost = 0
+            # record() adds each match's rows together, so they're contiguous
+            for match1_id, match_rows in itertools.groupby(rows, key=lambda row: row[0]):
+                match_rows = list(match_rows)
+                try:
+                    with conn:
+                        cursor.executemany(upsert_sql, match_rows)
+                    total_imported += len(match_rows)
+                except sqlite3.Error as e:
+                    lost += 1
+                    print(f"  Error storing shared matches for match {match1_id}: {e}", flush=True)
+            if lost:
+                print(f"  Shared matches for {lost} matches were not stored; re-run --scan-shared "
+                      f"to retry them (with --force for matches scanned before)", flush=True)
+        rows.clear()
+
+    def record(i, match, shared_data):
+        match_id, match_guid, name, cm = match
+        print(f"\n[{i+1}/{len(matches)}] {name} ({cm:.0f} cM)...", flush=True)
+        if isinstance(shared_data, Exception):
+            print(f"  Error: {shared_data}", flush=True)
+            return
+
+        rows.extend(
+            (match_id, name_to_id.get(shared['name']), shared['name'], shared['match_cm'], shared['your_cm'])
+            for shared in shared_data
+        )
+        print(f"  Found {len(shared_data)} shared matches", flush=True)
+        if len(rows) >= 500:
+            flush()
 
-        finally:
-            context.close()
-            browser.close()
+    try:
+        _run_scan(browser, headless, matches, test_guid, scan_one, record)
+    finally:
+        flush()
+        conn.close()
 
     print(f"\n" + "=" * 60)
     print(f"SCAN COMPLETE")
@@ -1644,7 +2393,7 @@ def scan_shared_matches(test_guid=None, headless=True, limit=None, min_cm=None):
     print(f"  Total relationships stored: {total_imported}")
 
     # Show summary
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect_db()
     cursor = conn.cursor()
     cursor.execute("SELECT COUNT(*) FROM shared_match")
     total = cursor.fetchone()[0]
@@ -1668,16 +2417,170 @@ def scan_shared_matches(test_guid=None, headless=True, limit=None, min_cm=None):
     conn.close()
 
 
-def fetch_shared_matches(match_name, test_guid=None, headless=False):
+def scan_all(test_guid=None, headless=True, limit=None, min_cm=None, force=False):
+    """Run scan_trees then scan_shared_matches on one shared browser."""
+    with ancestry_browser(headless) as browser:
+        scan_trees(test_guid=test_guid, headless=headless, limit=limit, min_cm=min_cm,
+                   browser=browser, force=force)
+        scan_shared_matches(test_guid=test_guid, headless=headless, limit=limit, min_cm=min_cm,
+                            browser=browser, force=force)
+
+
+SHARED_MATCH_FIELDS = ('name', 'your_cm', 'your_relationship', 'match_cm',
+                       'match_relationship', 'side', 'guid')
+
+
+def _extract_shared_on_page(page, test_guid, match_guid):
     """
-    Fetch shared matches for a specific DNA match.
+    Open a match's shared matches on `page`, scroll them all in and return
+    them as dicts keyed by SHARED_MATCH_FIELDS. The DOM half of
+    fetch_shared_matches, which owns the browser.
+    """
+    from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+    # Get our test GUID if not provided
+    if not test_guid:
+        page.goto(f"{ANCESTRY_BASE_URL}/dna", wait_until="domcontentloaded", timeout=60000)
+        time.sleep(2)
+        guid_match = GUID_RE.search(page.url)
+        if guid_match:
+            test_guid = guid_match.group(1).upper()
+
+    # Navigate to compare page first
+    compare_url = f"{ANCESTRY_BASE_URL}/discoveryui-matches/compare/{test_guid}/with/{match_guid}"
+    print(f"Navigating to compare page...", flush=True)
+    page.goto(compare_url, wait_until="domcontentloaded", timeout=60000)
+    time.sleep(3)
+
+    print(f"URL: {page.url}", flush=True)
+
+    # Look for and click "Shared Matches" tab
+    try:
+        shared_tab = page.query_selector('text=Shared matches, text=Shared Matches, [href*="shared"]')
+        if shared_tab:
+            shared_tab.click()
+        else:
+            # Try clicking by text
+            page.click('text=Shared matches', timeout=5000)
+    except Exception as e:
+        print(f"Could not find shared matches tab: {e}", flush=True)
+
+    print(f"After click URL: {page.url}", flush=True)
+
+    # Wait for the first shared matches to render
+    try:
+        page.wait_for_selector('.matchOfMatchEntry', state="attached", timeout=10000)
+    except PlaywrightTimeoutError:
+        time.sleep(1)  # None yet; give a slow list one more moment before counting
+
+    # Scroll to load all shared matches (if infinite scroll is used), in one
+    # evaluate: bring the last entry into view, then wait for a mutation that
+    # adds entries, and stop once 1.5s pass without one
+    count = page.evaluate("""
+        async () => {
+            const entries = document.getElementsByClassName('matchOfMatchEntry');  // live
+            const grew = (n) => new Promise((resolve) => {
+                const observer = new MutationObserver(() => {
+                    if (entries.length > n) done(true);
+                });
+                const timer = setTimeout(() => done(false), 1500);
+                const done = (result) => {
+                    observer.disconnect();
+                    clearTimeout(timer);
+                    resolve(result);
+                };
+                observer.observe(document.body, {childList: true, subtree: true});
+            });
+            for (let i = 0; i < 200 && entries.length; i++) {  // Safety cap
+                const n = entries.length;
+                entries[n - 1].scrollIntoView({block: 'end'});
+                if (!await grew(n)) break;
+            }
+            return entries.length;
+        }
+    """)
+
+    print(f"Found {count} shared matches total", flush=True)
+
+    # Extract shared match data using JavaScript, as parallel arrays
+    # (one per field) to keep the CDP payload small
+    columns = page.evaluate("""
+        () => {
+            const CM_RE = /(\\d[\\d,]*)\\s*cM/i;
+            const GUID_RE = /with\\/([A-F0-9-]{36})/i;
+            // One scan of the side label instead of lowercasing it and
+            // testing each keyword in turn
+            const SIDE_RE = /(both|paternal|maternal|parent [12])/i;
+            const SIDES = {both: 'both', paternal: 'paternal', maternal: 'maternal',
+                           'parent 1': 'unknown', 'parent 2': 'unknown'};
+            const cols = {name: [], your_cm: [], your_relationship: [], match_cm: [],
+                          match_relationship: [], side: [], guid: []};
+            const text = (el) => el?.textContent.trim() ?? null;
+            const toInt = (s) => {
+                let v = 0;
+                for (let i = 0; i < s.length; i++) {
+                    const d = s.charCodeAt(i) - 48;
+                    if (d >= 0 && d <= 9) v = v * 10 + d;
+                }
+                return v;
+            };
+            const parseCm = (el) => {
+                const m = el && CM_RE.exec(el.textContent);
+                return m ? toInt(m[1]) : null;
+            };
+            const entries = document.querySelectorAll('.matchOfMatchEntry');
+            for (let i = 0, n = entries.length; i < n; i++) {
+                const entry = entries[i];
+                // Get name from the link
+                const nameEl = entry.querySelector('a.matchInfoName');
+                const name = text(nameEl);
+                if (!name) continue;
+
+                // YOUR shared cM, relationship and side from .yourSharedDNA;
+                // one walk of its subtree finds both labels
+                const yourDnaEl = entry.querySelector('.yourSharedDNA');
+                let yourRelEl = null, sideEl = null;
+                if (yourDnaEl) {
+                    for (const el of yourDnaEl.querySelectorAll('.relationshipLabel, .familySideInfo')) {
+                        if (el.classList.contains('relationshipLabel')) yourRelEl ??= el;
+                        else sideEl ??= el;
+                    }
+                }
+                const sideMatch = sideEl && SIDE_RE.exec(sideEl.textContent);
+
+                // MATCH's shared cM and relationship from .matchSharedDNA
+                const matchDnaEl = entry.querySelector('.matchSharedDNA');
+
+                // Extract GUID from link
+                const guidMatch = nameEl.href && GUID_RE.exec(nameEl.href);
+
+                cols.name.push(name);
+                cols.your_cm.push(parseCm(yourDnaEl));
+                cols.your_relationship.push(text(yourRelEl));
+                cols.match_cm.push(parseCm(matchDnaEl));
+                cols.match_relationship.push(text(matchDnaEl?.querySelector('.relationshipLabel')));
+                cols.side.push(sideMatch ? SIDES[sideMatch[1].toLowerCase()] : null);
+                cols.guid.push(guidMatch ? guidMatch[1].toUpperCase() : null);
+            }
+            return cols;
+        }
+    """)
+
+    return [dict(zip(SHARED_MATCH_FIELDS, row))
+            for row in zip(*(columns[field] for field in SHARED_MATCH_FIELDS))]
+
+
+def fetch_shared_matches(match_name, test_guid=None, headless=True):
+    """
+    Fetch shared matches for a specific DNA match, in a browser launched for
+    this one lookup. scan_shared_matches covers many matches in one browser.
     """
     from playwright.sync_api import sync_playwright
 
     print(f"\nFetching shared matches for: {match_name}")
 
     # First, look up the match in the database to get their GUID
-    conn = sqlite3.connect(DB_PATH)
+    conn = connect_db()
     cursor = conn.cursor()
     cursor.execute(
         "SELECT ancestry_id, name, shared_cm FROM dna_match WHERE name LIKE ?",
@@ -1706,197 +2609,87 @@ def fetch_shared_matches(match_name, test_guid=None, headless=False):
 
     # Get cookies
     print("Extracting cookies from Chrome...", flush=True)
-    cookie_list = []
-    for domain in [".ancestry.co.uk", ".ancestry.com"]:
-        try:
-            cookies = browser_cookie3.chrome(domain_name=domain)
-            for cookie in cookies:
-                cookie_list.append({
-                    "name": cookie.name,
-                    "value": cookie.value,
-                    "domain": cookie.domain,
-                    "path": cookie.path,
-                    "secure": bool(cookie.secure),
-                })
-        except:
-            pass
+    cookie_list = list(_playwright_cookies())
 
     if not cookie_list:
         print("No cookies found - log into Ancestry in Chrome first")
         return []
 
-    shared_matches = []
-
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=headless)
-        context = browser.new_context(
-            user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"
-        )
-        context.add_cookies(cookie_list)
-        page = context.new_page()
-
-        try:
-            # Get our test GUID if not provided
-            if not test_guid:
-                page.goto(f"{ANCESTRY_BASE_URL}/dna", wait_until="domcontentloaded", timeout=60000)
-                time.sleep(2)
-                guid_match = re.search(r'/([A-F0-9]{8}-[A-F0-9]{4}-[A-F0-9]{4}-[A-F0-9]{4}-[A-F0-9]{12})',
-                                       page.url, re.IGNORECASE)
-                if guid_match:
-                    test_guid = guid_match.group(1).upper()
-
-            # Navigate to compare page first
-            compare_url = f"{ANCESTRY_BASE_URL}/discoveryui-matches/compare/{test_guid}/with/{match_guid}"
-            print(f"Navigating to compare page...", flush=True)
-            page.goto(compare_url, wait_until="domcontentloaded", timeout=60000)
-            time.sleep(3)
-
-            print(f"URL: {page.url}", flush=True)
-
-            # Look for and click "Shared Matches" tab
+    try:
+        with sync_playwright() as p:
+            browser = launch_browser(p, headless=headless)
+            context = browser.new_context(
+                user_agent="Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36",
+                storage_state=saved_storage_state(),
+            )
+            context.add_cookies(cookie_list)
             try:
-                shared_tab = page.query_selector('text=Shared matches, text=Shared Matches, [href*="shared"]')
-                if shared_tab:
-                    shared_tab.click()
-                    time.sleep(2)
-                else:
-                    # Try clicking by text
-                    page.click('text=Shared matches', timeout=5000)
-                    time.sleep(2)
-            except Exception as e:
-                print(f"Could not find shared matches tab: {e}", flush=True)
-
-            print(f"After click URL: {page.url}", flush=True)
-
-            # Wait for shared matches to load
-            time.sleep(3)
-
-            # Scroll to load all shared matches (if infinite scroll is used)
-            prev_count = 0
-            for scroll_attempt in range(10):  # Max 10 scroll attempts
-                match_elements = page.query_selector_all('.matchOfMatchEntry')
-                count = len(match_elements)
-                print(f"  Loaded {count} shared matches...", flush=True)
-                if count == prev_count:
-                    break  # No more loading
-                prev_count = count
-                # Scroll to bottom
-                page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                time.sleep(1.5)
-
-            print(f"Found {len(match_elements)} shared matches total", flush=True)
-
-            # Extract shared match data using JavaScript
-            shared_matches = page.evaluate("""
-                () => {
-                    const matches = [];
-                    const entries = document.querySelectorAll('.matchOfMatchEntry');
-                    entries.forEach((entry) => {
-                        try {
-                            // Get name from the link
-                            const nameEl = entry.querySelector('a.matchInfoName');
-                            const name = nameEl ? nameEl.textContent.trim() : null;
-
-                            // Get YOUR shared cM from .yourSharedDNA
-                            const yourDnaEl = entry.querySelector('.yourSharedDNA');
-                            let yourCm = null;
-                            let yourRelationship = null;
-                            let side = null;
-                            if (yourDnaEl) {
-                                const yourText = yourDnaEl.textContent;
-                                const cmMatch = yourText.match(/([\\d,]+)\\s*cM/i);
-                                if (cmMatch) {
-                                    yourCm = parseFloat(cmMatch[1].replace(/,/g, ''));
-                                }
-                                const relEl = yourDnaEl.querySelector('.relationshipLabel');
-                                yourRelationship = relEl ? relEl.textContent.trim() : null;
-                                const sideEl = yourDnaEl.querySelector('.familySideInfo');
-                                if (sideEl) {
-                                    const sideText = sideEl.textContent.toLowerCase();
-                                    if (sideText.includes('both')) side = 'both';
-                                    else if (sideText.includes('paternal')) side = 'paternal';
-                                    else if (sideText.includes('maternal')) side = 'maternal';
-                                    else if (sideText.includes('parent 1')) side = 'unknown';
-                                    else if (sideText.includes('parent 2')) side = 'unknown';
-                                }
-                            }
-
-                            // Get MATCH's shared cM from .matchSharedDNA
-                            const matchDnaEl = entry.querySelector('.matchSharedDNA');
-                            let matchCm = null;
-                            let matchRelationship = null;
-                            if (matchDnaEl) {
-                                const matchText = matchDnaEl.textContent;
-                                const cmMatch = matchText.match(/([\\d,]+)\\s*cM/i);
-                                if (cmMatch) {
-                                    matchCm = parseFloat(cmMatch[1].replace(/,/g, ''));
-                                }
-                                const relEl = matchDnaEl.querySelector('.relationshipLabel');
-                                matchRelationship = relEl ? relEl.textContent.trim() : null;
-                            }
-
-                            // Extract GUID from link
-                            let guid = null;
-                            if (nameEl && nameEl.href) {
-                                const guidMatch = nameEl.href.match(/with\\/([A-F0-9-]{36})/i);
-                                if (guidMatch) guid = guidMatch[1].toUpperCase();
-                            }
-
-                            if (name) {
-                                matches.push({
-                                    name: name,
-                                    your_cm: yourCm,
-                                    your_relationship: yourRelationship,
-                                    match_cm: matchCm,
-                                    match_relationship: matchRelationship,
-                                    side: side,
-                                    guid: guid
-                                });
-                            }
-                        } catch (e) {}
-                    });
-                    return matches;
-                }
-            """)
-
-            print(f"\nShared matches with {match_full_name} ({match_cm} cM):")
-            print("-" * 70)
-            print(f"{'Name':<25} {'You':<12} {'Them':<12} {'Side':<10}")
-            print("-" * 70)
-            for m in shared_matches:
-                you_cm = f"{m['your_cm']:.0f} cM" if m.get('your_cm') else "?"
-                them_cm = f"{m['match_cm']:.0f} cM" if m.get('match_cm') else "?"
-                side = m.get('side') or 'unknown'
-                print(f"  {m['name']:<23} {you_cm:<12} {them_cm:<12} {side:<10}")
-            print("-" * 70)
-            print(f"Total: {len(shared_matches)} shared matches")
-
-        except Exception as e:
-            print(f"Error: {e}")
-            import traceback
-            traceback.print_exc()
+                shared_matches = _extract_shared_on_page(context.new_page(), test_guid, match_guid)
+            finally:
+                save_storage_state(context)
+                context.close()
+                browser.close()
+    except Exception as e:
+        print(f"Error: {e}")
+        traceback.print_exc()
+        return []
 
-        finally:
-            context.close()
-            browser.close()
+    # The per-row table is for someone watching a terminal; piped or
+    # scripted runs get a one-line summary
+    if not sys.stdout.isatty():
+        print(f"Fetched {len(shared_matches)} shared matches for {match_full_name}")
+        return shared_matches
+
+    print(f"\nShared matches with {match_full_name} ({match_cm} cM):")
+    print("-" * 70)
+    print(f"{'Name':<25} {'You':<12} {'Them':<12} {'Side':<10}")
+    print("-" * 70)
+    # Build the table and write it once rather than a print() per row
+    lines = []
+    for m in shared_matches:
+        you_cm = f"{m['your_cm']:.0f} cM" if m.get('your_cm') else "?"
+        them_cm = f"{m['match_cm']:.0f} cM" if m.get('match_cm') else "?"
+        side = m.get('side') or 'unknown'
+        lines.append(f"  {m['name']:<23} {you_cm:<12} {them_cm:<12} {side:<10}\n")
+    sys.stdout.write("".join(lines))
+    print("-" * 70)
+    print(f"Total: {len(shared_matches)} shared matches")
 
     return shared_matches
 
 
 def main():
-    import argparse
     parser = argparse.ArgumentParser(description="Ancestry DNA Match Importer")
     parser.add_argument("--explore", action="store_true", help="Explore API to find pagination methods")
     parser.add_argument("--browser", action="store_true", help="Use Playwright browser automation (gets ALL matches)")
-    parser.add_argument("--headless", action="store_true", help="Run browser in headless mode (with --browser)")
+    parser.add_argument("--api-first", action="store_true",
+                        help="With --browser, try the matches-list API over httpx before the browser walk")
+    parser.add_argument("--headless", action="store_true", help="Run browser in headless mode (now the default)")
+    parser.add_argument("--show-browser", action="store_true", help="Show the browser window while it works")
+    parser.add_argument("--debug", action="store_true", help="Save a screenshot and page HTML to /tmp (with --browser)")
     parser.add_argument("--shared", metavar="NAME", help="Get shared matches for a specific match")
     parser.add_argument("--scan-trees", action="store_true", help="Scan matches for tree info (size, public/private)")
     parser.add_argument("--scan-shared", action="store_true", help="Scan shared matches and store relationships in DB")
     parser.add_argument("--limit", type=int, help="Limit number of matches to process")
     parser.add_argument("--min-cm", type=float, help="Only process matches with at least this many cM")
     parser.add_argument("--test-guid", help="Use specific test GUID instead of auto-detecting")
+    parser.add_argument("--force", action="store_true", help="Rescan matches already scanned (with --scan-trees/--scan-shared), or re-import ones already imported (with --browser)")
+    parser.add_argument("--no-persist", action="store_true",
+                        help=f"Don't load or save browser state in {STORAGE_STATE_PATH.name}")
+    parser.add_argument("--cdp-endpoint", metavar="URL",
+                        help="Attach to a running Chromium (e.g. http://localhost:9222) instead of launching one")
+    parser.add_argument("--container", action="store_true",
+                        help="Launch Chromium without its sandbox (only for containers/CI running as root)")
     args = parser.parse_args()
 
+    global PERSIST_STORAGE_STATE, CDP_ENDPOINT
+    if args.no_persist:
+        PERSIST_STORAGE_STATE = False
+    if args.cdp_endpoint:
+        CDP_ENDPOINT = args.cdp_endpoint
+    if args.container:
+        CHROMIUM_ARGS.extend(CONTAINER_CHROMIUM_ARGS)
+
     print("=" * 60)
     print("ANCESTRY DNA MATCH IMPORTER")
     print("=" * 60)
@@ -1908,16 +2701,28 @@ def main():
 
     # Shared matches mode
     if args.shared:
-        fetch_shared_matches(args.shared, test_guid=args.test_guid, headless=args.headless)
+        fetch_shared_matches(args.shared, test_guid=args.test_guid, headless=not args.show_browser)
+        return
+
+    # Both scans, sharing one browser
+    if args.scan_trees and args.scan_shared:
+        scan_all(
+            test_guid=args.test_guid,
+            headless=not args.show_browser,
+            limit=args.limit,
+            min_cm=args.min_cm,
+            force=args.force
+        )
         return
 
     # Scan trees mode
     if args.scan_trees:
         scan_trees(
             test_guid=args.test_guid,
-            headless=args.headless,
+            headless=not args.show_browser,
             limit=args.limit,
-            min_cm=args.min_cm
+            min_cm=args.min_cm,
+            force=args.force
         )
         return
 
@@ -1925,21 +2730,74 @@ def main():
     if args.scan_shared:
         scan_shared_matches(
             test_guid=args.test_guid,
-            headless=args.headless,
+            headless=not args.show_browser,
             limit=args.limit,
-            min_cm=args.min_cm
+            min_cm=args.min_cm,
+            force=args.force
         )
         return
 
     # Browser automation mode
     if args.browser:
-        matches = fetch_matches_with_browser(test_guid=args.test_guid, headless=args.headless, limit=args.limit)
-
-        if not matches:
-            print("\nNo matches extracted. Check the saved HTML for debugging.")
+        # Look the test GUID up over plain HTTP rather than a browser page load
+        test_guid = args.test_guid
+        if not test_guid:
+            session = create_session()
+            test_guid = get_test_guid(session) if session else None
+
+        # Plain API requests are much cheaper than driving a browser, but usually
+        # stop at 200 matches, so they're only tried on request. Whatever they
+        # import is skipped by the browser walk below if it has to take over.
+        if args.api_first and test_guid and fetch_matches_with_api(test_guid, limit=args.limit or 10000):
+            print("\nDone!")
+            return
+
+        # Matches imported by an earlier (perhaps interrupted) run are walked
+        # past rather than handed to the importer again
+        known_guids = frozenset() if args.force else load_known_guids(DB_PATH)
+        resume_page = 0 if args.force else load_scrape_state(DB_PATH, MATCH_LIST_PAGE_KEY) or 0
+        progress = {}
+        pages = fetch_matches_with_browser(test_guid=test_guid, headless=not args.show_browser,
+                                           limit=args.limit or 10000, debug=args.debug,
+                                           known_guids=known_guids, start_page=resume_page + 1,
+                                           progress=progress)
+        first = next(pages, None)
+        if first is None:
+            if known_guids:
+                print(f"\nNo new matches found ({len(known_guids)} already imported; --force to re-import).")
+                print("If that's unexpected, re-run with --debug to save the page HTML and a screenshot.")
+                return
+            print("\nNo matches extracted. Re-run with --debug to save the page HTML and a screenshot.")
             sys.exit(1)
 
-        import_browser_matches(matches, DB_PATH)
+        # Save on a worker thread so database commits overlap with scraping the
+        # next pages. Playwright stays on this thread; only match lists cross.
+        # Each batch carries the last list page completed when it was scraped;
+        # it's stored with the rows so an interrupted run resumes from there.
+        batches = queue.Queue()
+        state = {}
+
+        def queued_matches():
+            for page_done, page_matches in iter(batches.get, None):
+                yield from page_matches
+                if page_done:
+                    state[MATCH_LIST_PAGE_KEY] = page_done
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            writer = executor.submit(import_browser_matches, queued_matches(), DB_PATH, state=state)
+            try:
+                for page_matches in itertools.chain([first], pages):
+                    if writer.done():
+                        break  # The writer failed; its error is raised below
+                    batches.put((progress.get("page"), page_matches))
+            finally:
+                pages.close()
+                batches.put(None)
+            writer.result()
+
+        if progress.get("done"):
+            clear_scrape_state(DB_PATH, MATCH_LIST_PAGE_KEY)
+
         print("\nDone!")
         return
 
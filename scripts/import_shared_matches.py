@@ -27,6 +27,22 @@ BASE_URL = "https://www.ancestry.co.uk"
 # Your test GUID
 MY_TEST_GUID = "E756DE6C-0C8D-443B-8793-ADDB6F35FD6A"
 
+# Compiled once; used for every page of every match
+JSON_NAME_CM_RE = re.compile(r'"displayName"\s*:\s*"([^"]+)"[^}]*"sharedCentimorgans"\s*:\s*(\d+\.?\d*)')
+JSON_CM_NAME_RE = re.compile(r'"sharedCentimorgans"\s*:\s*(\d+\.?\d*)[^}]*"displayName"\s*:\s*"([^"]+)"')
+
+
+def leading_cm(line):
+    """
+    The cM value a line starts with ("123.5 cM"), else None. Done with
+    partition rather than a regex, since it runs on every line of the page.
+    """
+    value, sep, _ = line.partition('cM')
+    value = value.rstrip()
+    if sep and value[:1].isdecimal() and value.replace('.', '', 1).isdecimal():
+        return float(value)
+    return None
+
 
 def get_cookies():
     """Get ancestry cookies from Chrome."""
@@ -87,14 +103,14 @@ def fetch_shared_matches(page, match_guid, match_name):
             return []
 
         # Scroll to load all matches (they lazy load)
+        match_cards = page.locator('[data-testid="match-card"], .matchCard, .match-card, [class*="MatchCard"]')
         last_count = 0
         scroll_attempts = 0
         max_scrolls = 20
 
         while scroll_attempts < max_scrolls:
-            # Count current matches
-            match_cards = page.query_selector_all('[data-testid="match-card"], .matchCard, .match-card, [class*="MatchCard"]')
-            current_count = len(match_cards)
+            # Count current matches (count() creates no element handles)
+            current_count = match_cards.count()
 
             if current_count == last_count:
                 scroll_attempts += 1
@@ -123,9 +139,8 @@ def fetch_shared_matches(page, match_guid, match_name):
             line = lines[i].strip()
 
             # Look for cM values
-            cm_match = re.match(r'^(\d+\.?\d*)\s*cM', line)
-            if cm_match:
-                cm_value = float(cm_match.group(1))
+            cm_value = leading_cm(line)
+            if cm_value is not None:
                 # Look backwards for name (usually 1-3 lines before)
                 name = None
                 for j in range(1, 4):
@@ -133,7 +148,7 @@ def fetch_shared_matches(page, match_guid, match_name):
                         potential_name = lines[i - j].strip()
                         # Name should be non-empty, not a cM value, not too long
                         if (potential_name and
-                            not re.match(r'^\d+\.?\d*\s*cM', potential_name) and
+                            leading_cm(potential_name) is None and
                             len(potential_name) < 50 and
                             len(potential_name) > 1 and
                             not potential_name.startswith('Shared') and
@@ -149,7 +164,7 @@ def fetch_shared_matches(page, match_guid, match_name):
             i += 1
 
         # Method 2: Try to extract from JSON in page
-        json_matches = re.findall(r'"displayName"\s*:\s*"([^"]+)"[^}]*"sharedCentimorgans"\s*:\s*(\d+\.?\d*)', content)
+        json_matches = JSON_NAME_CM_RE.findall(content)
         for name, cm in json_matches:
             cm_val = float(cm)
             # Avoid duplicates
@@ -160,7 +175,7 @@ def fetch_shared_matches(page, match_guid, match_name):
                 })
 
         # Alternative JSON pattern
-        json_matches2 = re.findall(r'"sharedCentimorgans"\s*:\s*(\d+\.?\d*)[^}]*"displayName"\s*:\s*"([^"]+)"', content)
+        json_matches2 = JSON_CM_NAME_RE.findall(content)
         for cm, name in json_matches2:
             cm_val = float(cm)
             if not any(m['name'] == name for m in shared_matches):
@@ -28,6 +28,8 @@ import browser_cookie3
 
 DB_PATH = Path(__file__).parent.parent / "genealogy.db"
 ANCESTRY_BASE_URL = "https://www.ancestry.co.uk"
+GUID_RE = re.compile(r'/([A-F0-9]{8}-[A-F0-9]{4}-[A-F0-9]{4}-[A-F0-9]{4}-[A-F0-9]{12})', re.IGNORECASE)
+TREE_URL_RE = re.compile(r'/tree/(\d+:\d+:\d+)')
 
 
 def get_cookies():
@@ -59,15 +61,12 @@ def get_test_guid_and_tree(page):
     tree_id = None
 
     # Check if already on a DNA page with GUID
-    guid_match = re.search(
-        r'/([A-F0-9]{8}-[A-F0-9]{4}-[A-F0-9]{4}-[A-F0-9]{4}-[A-F0-9]{12})',
-        page.url, re.IGNORECASE
-    )
+    guid_match = GUID_RE.search(page.url)
     if guid_match:
         guid = guid_match.group(1).upper()
 
     # Check for tree ID in URL (format: tree/123456789:1234:56)
-    tree_match = re.search(r'/tree/(\d+:\d+:\d+)', page.url)
+    tree_match = TREE_URL_RE.search(page.url)
     if tree_match:
         tree_id = tree_match.group(1)
 
@@ -79,10 +78,7 @@ def get_test_guid_and_tree(page):
     page.goto(f"{ANCESTRY_BASE_URL}/dna", wait_until="networkidle", timeout=60000)
     time.sleep(2)
 
-    guid_match = re.search(
-        r'/([A-F0-9]{8}-[A-F0-9]{4}-[A-F0-9]{4}-[A-F0-9]{4}-[A-F0-9]{12})',
-        page.url, re.IGNORECASE
-    )
+    guid_match = GUID_RE.search(page.url)
     if guid_match:
         guid = guid_match.group(1).upper()
 
@@ -93,7 +89,7 @@ def get_test_guid_and_tree(page):
         time.sleep(3)
 
         # Check if redirected to new URL format
-        tree_match = re.search(r'/tree/(\d+:\d+:\d+)', page.url)
+        tree_match = TREE_URL_RE.search(page.url)
         if tree_match:
             tree_id = tree_match.group(1)
         else:
@@ -383,8 +379,8 @@ def update_dna_match_mrca(cursor, match_name, mrca_text, confidence='confirmed')
     return cursor.rowcount
 
 
-def scrape_thrulines(headless=False, ancestor_filter=None):
-    """Main function to scrape ThruLines."""
+def scrape_thrulines(headless=False, ancestor_filter=None, debug=False):
+    """Main function to scrape ThruLines. debug saves screenshots and the page HTML to /tmp."""
     from playwright.sync_api import sync_playwright
 
     print("\n" + "=" * 60)
@@ -469,15 +465,15 @@ def scrape_thrulines(headless=False, ancestor_filter=None):
                 print("\nNot logged in! Please log into Ancestry in Chrome first.")
                 return
 
-            # Save screenshot for debugging
-            page.screenshot(path="/tmp/thrulines_debug.png")
-            print("Saved screenshot to /tmp/thrulines_debug.png", flush=True)
+            # Save screenshot and HTML for debugging
+            if debug:
+                page.screenshot(path="/tmp/thrulines_debug.png")
+                print("Saved screenshot to /tmp/thrulines_debug.png", flush=True)
 
-            # Save HTML for analysis
-            html = page.content()
-            with open("/tmp/thrulines.html", "w") as f:
-                f.write(html)
-            print("Saved HTML to /tmp/thrulines.html", flush=True)
+                html = page.content()
+                with open("/tmp/thrulines.html", "w") as f:
+                    f.write(html)
+                print("Saved HTML to /tmp/thrulines.html", flush=True)
 
             # Wait for content to load
             print("\nWaiting for ThruLines to load...", flush=True)
@@ -589,7 +585,8 @@ def scrape_thrulines(headless=False, ancestor_filter=None):
                         time.sleep(2)
 
                         # Save screenshot for debugging
-                        page.screenshot(path=f"/tmp/thrulines_ahn{ahnentafel}.png")
+                        if debug:
+                            page.screenshot(path=f"/tmp/thrulines_ahn{ahnentafel}.png")
 
                         # Extract people from this ancestor's ThruLine view
                         detail_data = page.evaluate("""
@@ -795,12 +792,13 @@ def main():
     parser.add_argument("--headless", action="store_true", help="Run browser in headless mode")
     parser.add_argument("--list", action="store_true", help="List ancestors without importing")
     parser.add_argument("--filter", type=str, help="Only import ancestors matching this name")
+    parser.add_argument("--debug", action="store_true", help="Save screenshots and page HTML to /tmp")
     args = parser.parse_args()
 
     if args.list:
         list_thrulines_ancestors(headless=args.headless)
     else:
-        scrape_thrulines(headless=args.headless, ancestor_filter=args.filter)
+        scrape_thrulines(headless=args.headless, ancestor_filter=args.filter, debug=args.debug)
 
 
 if __name__ == "__main__":